@@ -3,7 +3,7 @@
 import logging
 import os
 import re
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 
 import requests
 from bs4 import BeautifulSoup
@@ -14,12 +14,11 @@ try:
 except ImportError:
     pass
 
+from .grok_client import get_grok_client
 from .selector_cache import SelectorCache
 
 logger = logging.getLogger(__name__)
 
-GROK_URL = "https://api.x.ai/v1/chat/completions"
-
 # Basic sanity-check pattern: must start with a CSS-valid character
 _VALID_SELECTOR_RE = re.compile(r'^[#.\[\w:*]')
 
@@ -30,8 +29,14 @@ class AISelectorHealer:
     and selector validation.
     """
 
-    def __init__(self, use_cache: bool = True):
-        self.cache = SelectorCache() if use_cache else None
+    def __init__(self, use_cache: bool = True, cache: Optional[SelectorCache] = None):
+        # *cache* lets several healers (e.g. one per concurrent test) share
+        # one SelectorCache while keeping their own healing_history.
+        if cache is not None:
+            self.cache = cache
+        else:
+            self.cache = SelectorCache() if use_cache else None
+        self.client = get_grok_client()
         self.healing_history = []
 
     # ------------------------------------------------------------------
@@ -45,51 +50,90 @@ class AISelectorHealer:
         action_hint: str,
         page_url: str = "",
         page_title: str = "",
+        validate: Optional[Callable[[str], bool]] = None,
+        fingerprint: Optional[Dict[str, str]] = None,
     ) -> Optional[str]:
         """
         Attempt to find a working replacement for *failed_selector*.
 
+        *validate*, if given, is called with each candidate (e.g. to check
+        it matches a visible element on the live page).  A cached selector
+        that fails it is invalidated; a fresh one that fails it is
+        discarded.  When the AI answered and neither its selector nor the
+        semantic fallback passes, the tuple is put in the negative cache so
+        it is not retried until that entry expires; transport failures
+        (timeouts, 429/5xx after retries, connection errors) are not cached.
+        *fingerprint* (see page_fingerprint.py) makes cache keys specific
+        to the page structure.
+
         Returns the healed selector on success, or None if every strategy
         failed (callers can then decide whether to fall back to the original
         or raise an error).
         """
-        # Lazy API key check — supports load_dotenv called after import
-        api_key = os.getenv("GROK_API_KEY")
-        if not api_key:
-            logger.warning("GROK_API_KEY not set — skipping AI healing.")
-            return None
+        def _is_valid(candidate: Optional[str]) -> bool:
+            return bool(candidate) and (validate is None or validate(candidate))
 
-        # Cache hit
+        # Cache hit — checked first so cached heals work without an API key
         if self.cache:
-            cached = self.cache.get(page_url, failed_selector, action_hint)
-            if cached:
+            cached = self.cache.get(page_url, failed_selector, action_hint, fingerprint)
+            if cached and _is_valid(cached):
                 logger.debug("Cache hit: %s", cached)
                 self._record(failed_selector, cached, action_hint, success=True)
                 return cached
+            if cached:
+                logger.info("Cached selector %r no longer matches — invalidating", cached)
+                self.cache.invalidate(page_url, failed_selector, action_hint, fingerprint)
+
+            if self.cache.is_unhealable(page_url, failed_selector, action_hint, fingerprint):
+                logger.info("Selector %r is known to be unhealable — skipping", failed_selector)
+                self._record(failed_selector, None, action_hint, success=False)
+                return None
 
-        healed: Optional[str] = None
+        # Lazy API key check — supports load_dotenv called after import
+        api_key = os.getenv("GROK_API_KEY")
+        if not api_key:
+            logger.warning("GROK_API_KEY not set — skipping AI healing.")
+            return None
 
         # Strategy 1 — AI with enriched context
-        healed = self._heal_with_ai_enhanced(
+        healed, ai_answered = self._heal_with_ai_enhanced(
             html_content, failed_selector, action_hint, page_url, page_title, api_key
         )
+        method = "AI"
 
         # Strategy 2 — lightweight semantic analysis (no API call)
-        if not healed:
+        if not _is_valid(healed):
             healed = self._heal_with_semantic_analysis(
                 html_content, failed_selector, action_hint
             )
+            method = "SEMANTIC"
+            if not _is_valid(healed):
+                healed = None
 
         success = bool(healed and healed != failed_selector)
 
-        if success and self.cache:
-            self.cache.set(
-                page_url, failed_selector, action_hint, healed, "AI"
-            )
+        if self.cache:
+            if success:
+                self.cache.set(
+                    page_url, failed_selector, action_hint, healed, method, fingerprint
+                )
+            elif ai_answered:
+                self.cache.set_unhealable(page_url, failed_selector, action_hint, fingerprint)
 
         self._record(failed_selector, healed, action_hint, success=success)
         return healed if success else None
 
+    def remember(
+        self, page_url: str, failed_selector: str, action_hint: str,
+        healed_selector: str, method: str,
+        fingerprint: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Cache a heal found outside heal() (e.g. HEURISTIC by the executor)."""
+        if self.cache and healed_selector != failed_selector:
+            self.cache.set(
+                page_url, failed_selector, action_hint, healed_selector, method, fingerprint
+            )
+
     def get_healing_stats(self) -> dict:
         """Return cumulative healing statistics."""
         total = len(self.healing_history)
@@ -101,6 +145,7 @@ class AISelectorHealer:
             "successful": successful,
             "success_rate": round((successful / total) * 100, 1),
             "cache_stats": self.cache.get_stats() if self.cache else None,
+            "api_stats": self.client.get_stats(),
         }
 
     # ------------------------------------------------------------------
@@ -115,7 +160,11 @@ class AISelectorHealer:
         page_url: str,
         page_title: str,
         api_key: str,
-    ) -> Optional[str]:
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Returns (selector, answered): *answered* is False when no response
+        came back, so the caller does not mark the selector unhealable.
+        """
         relevant_html = self._extract_relevant_html(html_content, action_hint)
 
         prompt = f"""You are an expert CSS selector generator for web automation.
@@ -149,44 +198,37 @@ RULES:
 SELECTOR:"""
 
         try:
-            response = requests.post(
-                GROK_URL,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "grok-beta",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are a CSS selector expert. "
-                                "Return only the raw selector string, nothing else."
-                            ),
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    "temperature": 0.1,
-                },
-                timeout=15,
+            raw = self.client.chat(
+                [
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are a CSS selector expert. "
+                            "Return only the raw selector string, nothing else."
+                        ),
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                api_key,
+                purpose="heal",
             )
-            response.raise_for_status()
-            raw = response.json()["choices"][0]["message"]["content"].strip()
             selector = self._clean_selector(raw)
 
             if not self._is_valid_selector(selector):
                 logger.warning("AI returned an invalid-looking selector: %r", selector)
-                return None
+                return None, True
 
-            return selector
+            return selector, True
 
         except requests.exceptions.Timeout:
-            logger.warning("AI healing timed out after 15s for selector: %r", failed_selector)
-            return None
+            logger.warning(
+                "AI healing timed out after %dms for selector: %r",
+                self.client.read_timeout_ms, failed_selector,
+            )
+            return None, False
         except Exception:
             logger.exception("AI healing error")
-            return None
+            return None, False
 
     # ------------------------------------------------------------------
     # Strategy 2 — Semantic analysis (BeautifulSoup, no API)
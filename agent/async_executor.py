@@ -0,0 +1,658 @@
+# agent/async_executor.py
+
+import asyncio
+import logging
+import os
+import re
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from playwright.async_api import Browser, Page, async_playwright
+
+from .ai_selector import AISelectorHealer
+from .config import Config
+from .error_handler import ErrorCategory, ErrorHandler
+from .network_profile import ResourceBlocker, har_settings_for
+from .selector_cache import SelectorCache
+from .video_retention import retain_video
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Async waits
+# ---------------------------------------------------------------------------
+
+class AsyncSmartWait:
+    """
+    Non-blocking counterparts of the SmartWait strategies used by
+    EnhancedExecutor.  Waits are delegated to Playwright (locator waits and
+    in-page wait_for_function) so they yield to the event loop instead of
+    sleeping the thread.
+    """
+
+    async def wait_dom_ready(self, page: Page, timeout: int = 5000) -> bool:
+        try:
+            await page.wait_for_function(
+                "() => document.readyState === 'complete'", timeout=timeout
+            )
+            return True
+        except Exception:
+            return False
+
+    async def wait_network_idle(self, page: Page, timeout: int = 5000) -> bool:
+        try:
+            await page.wait_for_load_state("networkidle", timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    async def wait_for_element(
+        self, page: Page, selector: str, timeout: int = 5000, visible: bool = True
+    ) -> bool:
+        try:
+            await page.locator(selector).first.wait_for(
+                state="visible" if visible else "attached", timeout=timeout
+            )
+            return True
+        except Exception:
+            return False
+
+    async def wait_for_element_clickable(
+        self, page: Page, selector: str, timeout: int = 5000
+    ) -> bool:
+        start = time.monotonic()
+        if not await self.wait_for_element(page, selector, timeout=timeout):
+            return False
+        remaining = max(timeout - int((time.monotonic() - start) * 1000), 1)
+        try:
+            handle = await page.locator(selector).first.element_handle(
+                timeout=remaining
+            )
+            await handle.wait_for_element_state("enabled", timeout=remaining)
+            return True
+        except Exception:
+            return False
+
+    async def wait_for_text(self, page: Page, text: str, timeout: int = 5000) -> bool:
+        try:
+            await page.wait_for_function(
+                "(needle) => document.body && "
+                "document.body.innerText.toLowerCase().includes(needle)",
+                arg=text.lower(),
+                timeout=timeout,
+            )
+            return True
+        except Exception:
+            return False
+
+    async def smart_wait_after_action(self, page: Page, action_type: str) -> None:
+        if action_type in ("goto", "click"):
+            await self.wait_dom_ready(page, timeout=3000)
+            await self.wait_network_idle(page, timeout=2000)
+        elif action_type in ("type", "select"):
+            await asyncio.sleep(0.2)
+        elif action_type == "scroll":
+            await asyncio.sleep(0.5)
+            await self.wait_network_idle(page, timeout=2000)
+
+
+# ---------------------------------------------------------------------------
+# Executor
+# ---------------------------------------------------------------------------
+
+class AsyncEnhancedExecutor:
+    """
+    asyncio counterpart of EnhancedExecutor built on playwright.async_api.
+
+    run_batch() launches one browser and runs many tests concurrently in a
+    single event loop, each in its own BrowserContext, bounded by a
+    semaphore.  Supports the same action vocabulary and returns the same
+    result dict shape as EnhancedExecutor.execute_actions().
+
+    Per-test state (variables, error history, the selector healer and its
+    healing_stats) lives on the test run, not on the executor, so concurrent
+    tests never see each other's values.  Only the selector cache is shared.
+    """
+
+    def __init__(self):
+        self.wait = AsyncSmartWait()
+        self.cache = SelectorCache()
+        # id() of every context with a trace recording (see _start_trace).
+        self._tracing: Set[int] = set()
+
+        Config.validate()
+
+    # ------------------------------------------------------------------
+    # Public entry points
+    # ------------------------------------------------------------------
+
+    async def run_batch(
+        self,
+        actions_sets: List[Optional[List[Dict]]],
+        settings: Optional[Dict] = None,
+        concurrency: int = 8,
+    ) -> List[Dict]:
+        """
+        Execute every action set concurrently (at most *concurrency* at a
+        time) in one shared browser.  Results are returned in input order.
+        """
+        settings = settings or {}
+        is_headless = settings.get("headless", Config.HEADLESS_MODE)
+        slow_mo = 0 if is_headless else Config.SLOW_MO
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=is_headless, slow_mo=slow_mo)
+
+            async def _bounded(i: int, actions: Optional[List[Dict]]) -> Dict:
+                if actions is None:
+                    return _failed_result(RuntimeError("Skipped — no actions"))
+                # Same test ids (and so HAR paths) as the sync batch graph.
+                test_settings = har_settings_for(settings, f"ID-{i + 1:03d}")
+                async with semaphore:
+                    try:
+                        return await self.execute_actions(
+                            browser, actions, settings=test_settings
+                        )
+                    except Exception as exc:
+                        logger.exception("Unexpected async execution error")
+                        return _failed_result(exc)
+
+            try:
+                return list(
+                    await asyncio.gather(
+                        *(_bounded(i, a) for i, a in enumerate(actions_sets))
+                    )
+                )
+            finally:
+                self.cache.flush()
+                await browser.close()
+
+    def run_batch_sync(
+        self,
+        actions_sets: List[Optional[List[Dict]]],
+        settings: Optional[Dict] = None,
+        concurrency: int = 8,
+    ) -> List[Dict]:
+        """Blocking wrapper around run_batch() for synchronous callers."""
+        if sys.platform == "win32":
+            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+        return asyncio.run(
+            self.run_batch(actions_sets, settings=settings, concurrency=concurrency)
+        )
+
+    async def execute_actions(
+        self, browser: Browser, actions: List[Dict], settings: Optional[Dict] = None
+    ) -> Dict:
+        """Execute *actions* in a fresh context of *browser*."""
+        settings = settings or {}
+        global_timeout = settings.get("timeout", Config.DEFAULT_TIMEOUT)
+
+        logs: List[str] = []
+        screenshots: List[str] = []
+        console_logs: List[str] = []
+        variables: Dict[str, Any] = {}
+        error_handler = ErrorHandler()
+        # Own healer per test so healing_stats cover this test only.
+        healer = AISelectorHealer(cache=self.cache)
+        video_mode = settings.get("video_mode", Config.VIDEO_MODE)
+        record_video = Config.should_record_video(settings.get("attempt", 1), video_mode)
+
+        har_mode = settings.get("har_mode", Config.HAR_MODE)
+        har_path: Optional[str] = settings.get("har_path")
+        har_options: Dict[str, Any] = {}
+        if har_mode == "record" and har_path:
+            os.makedirs(os.path.dirname(har_path) or ".", exist_ok=True)
+            har_options = {"record_har_path": har_path, "record_har_content": "embed"}
+
+        context = await browser.new_context(
+            **har_options,
+            record_video_dir=Config.VIDEO_DIR if record_video else None,
+            viewport={
+                "width": Config.VIEWPORT_WIDTH,
+                "height": Config.VIEWPORT_HEIGHT,
+            },
+        )
+        context_closed = False
+        try:
+            blocker: Optional[ResourceBlocker] = None
+            if settings.get("block_resources", Config.RESOURCE_BLOCKING_ENABLED):
+                blocker = ResourceBlocker()
+                await blocker.attach_async(context)
+
+            if har_mode == "record" and har_path:
+                logs.append(f"[HAR] Recording network traffic to {har_path}")
+            elif har_mode == "replay" and har_path and os.path.exists(har_path):
+                await context.route_from_har(har_path, not_found=Config.HAR_NOT_FOUND)
+                logs.append(
+                    f"[HAR] Replaying from {har_path} "
+                    f"(unmatched requests: {Config.HAR_NOT_FOUND})"
+                )
+            else:
+                if har_mode == "replay" and har_path:
+                    logs.append(f"[HAR] No recording at {har_path} — using live network")
+                har_path = None
+
+            page = await context.new_page()
+
+            if Config.INCLUDE_CONSOLE_LOGS:
+                page.on(
+                    "console",
+                    lambda msg: console_logs.append(f"[CONSOLE] {msg.type}: {msg.text}"),
+                )
+
+            page.set_default_timeout(global_timeout)
+
+            async def _build_result(success: bool) -> Dict:
+                # Video file is only complete after context.close()
+                nonlocal context_closed
+                trace_path = await self._stop_trace(page, keep=not success)
+                self.cache.flush()
+                await context.close()
+                context_closed = True
+                video_path, video_bytes, video_bytes_discarded = retain_video(
+                    await page.video.path() if page.video else None, success, video_mode
+                )
+                result = {
+                    "success": success,
+                    "logs": logs,
+                    "screenshots": screenshots,
+                    "video": video_path,
+                    "video_bytes": video_bytes,
+                    "video_bytes_discarded": video_bytes_discarded,
+                    "console_logs": console_logs if Config.INCLUDE_CONSOLE_LOGS else [],
+                    "error_stats": error_handler.get_error_statistics(),
+                    "network_stats": blocker.get_stats() if blocker else {},
+                    "har": har_path,
+                    "trace": trace_path,
+                }
+                if success:
+                    result["variables"] = variables
+                    result["healing_stats"] = healer.get_healing_stats()
+                return result
+
+            for i, act in enumerate(actions):
+                action_type = act.get("action", "unknown")
+                logs.append(f"\n[STEP {i + 1}] Executing: {action_type}")
+
+                success, action_logs = await self._execute_single_action(
+                    page, act, variables, error_handler, healer
+                )
+                logs.extend(action_logs)
+
+                if not success:
+                    await self._capture_screenshot(page, logs, screenshots, label="error")
+                    return await _build_result(False)
+
+                if Config.SCREENSHOT_EACH_STEP:
+                    await self._capture_screenshot(
+                        page, logs, screenshots, label=f"step_{i + 1}"
+                    )
+
+            if Config.SCREENSHOT_ON_SUCCESS:
+                await self._capture_screenshot(page, logs, screenshots, label="success")
+                logs.append(f"[SUCCESS] All {len(actions)} actions completed successfully")
+
+            return await _build_result(True)
+        finally:
+            self._tracing.discard(id(context))
+            if not context_closed:
+                try:
+                    await context.close()
+                except Exception:
+                    logger.warning("Context close failed (browser may have crashed)")
+
+    # ------------------------------------------------------------------
+    # Retry wrapper
+    # ------------------------------------------------------------------
+
+    async def _execute_single_action(
+        self,
+        page: Page,
+        action: Dict,
+        variables: Dict[str, Any],
+        error_handler: ErrorHandler,
+        healer: AISelectorHealer,
+    ) -> Tuple[bool, List[str]]:
+        logs: List[str] = []
+        action_type = action.get("action")
+        max_retries = Config.MAX_RETRIES
+
+        for attempt in range(1, max_retries + 1):
+            try:
+                logs.extend(await self._perform_action(page, action, variables, healer))
+
+                if Config.SMART_WAIT_ENABLED:
+                    await self.wait.smart_wait_after_action(page, action_type)
+
+                return True, logs
+
+            except Exception as exc:
+                error_details = error_handler.handle_error(
+                    exc,
+                    action,
+                    context={"page_url": page.url, "retry_count": attempt},
+                )
+                category = ErrorCategory(error_details["category"])
+                should_retry, wait_ms = error_handler.should_retry(
+                    category, attempt, max_retries
+                )
+
+                is_last_attempt = attempt == max_retries
+                if should_retry and not is_last_attempt:
+                    if Config.TRACE_ON_RETRY and id(page.context) not in self._tracing:
+                        await self._start_trace(page, logs)
+                    logs.append(
+                        f"[RETRY {attempt}/{max_retries}] "
+                        f"{error_details['category']}: {str(exc)[:100]}"
+                    )
+                    if wait_ms > 0:
+                        await asyncio.sleep(wait_ms / 1000.0)
+                else:
+                    logs.append(f"[ERROR] {error_details['category']}: {exc}")
+                    logs.append(
+                        f"[SUGGESTIONS] "
+                        f"{', '.join(error_details['recovery_strategies'][:2])}"
+                    )
+                    return False, logs
+
+        return False, logs
+
+    # ------------------------------------------------------------------
+    # Action dispatcher — mirrors EnhancedExecutor._perform_action
+    # ------------------------------------------------------------------
+
+    async def _perform_action(
+        self, page: Page, action: Dict, variables: Dict[str, Any], healer: AISelectorHealer
+    ) -> List[str]:
+        logs: List[str] = []
+        action_type = action.get("action")
+        action_timeout = Config.get_timeout(action_type)
+
+        def sub(text):
+            return _replace_variables(text, variables)
+
+        # --- NAVIGATION ---
+        if action_type == "goto":
+            url = sub(action.get("value", ""))
+            await page.goto(url, timeout=action_timeout, wait_until="domcontentloaded")
+            await self.wait.wait_dom_ready(page)
+            await self.wait.wait_network_idle(page)
+            logs.append(f"[OK] Navigated to {url}")
+
+        # --- CLICK ---
+        elif action_type == "click":
+            selector = sub(action.get("value", ""))
+            if not await self.wait.wait_for_element_clickable(
+                page, selector, timeout=action_timeout
+            ):
+                selector = await self._try_heal(
+                    page, selector, f"click {selector}", logs, healer
+                )
+            await page.click(selector, timeout=action_timeout)
+            logs.append(f"[OK] Clicked: {selector}")
+
+        # --- TYPE ---
+        elif action_type == "type":
+            selector = sub(action.get("field", "input"))
+            value = sub(action.get("value", ""))
+            if not await self.wait.wait_for_element(
+                page, selector, timeout=action_timeout
+            ):
+                selector = await self._try_heal(
+                    page, selector, f"type '{value}' into {selector}", logs, healer
+                )
+            try:
+                await page.fill(selector, value, timeout=action_timeout)
+                logs.append(f"[OK] Typed '{value}' into {selector}")
+            except Exception:
+                await page.click(selector)
+                await page.keyboard.type(value)
+                logs.append(f"[FALLBACK] Typed '{value}' using keyboard")
+
+        # --- HOVER ---
+        elif action_type == "hover":
+            selector = sub(action.get("value", ""))
+            try:
+                await page.hover(selector, timeout=action_timeout)
+            except Exception:
+                logger.exception("Hover error")
+            logs.append(f"[OK] Hovered over: {selector}")
+
+        # --- SELECT ---
+        elif action_type == "select":
+            selector = action.get("field", "select")
+            value = action.get("value")
+            label = action.get("label")
+            if value is None and label is None:
+                raise ValueError(
+                    f"'select' action on '{selector}' requires 'value' or 'label'."
+                )
+            try:
+                if value is not None:
+                    await page.select_option(selector, value=value, timeout=action_timeout)
+                else:
+                    await page.select_option(selector, label=label, timeout=action_timeout)
+            except Exception:
+                logger.exception("Select option error")
+            logs.append(f"[OK] Selected option in: {selector}")
+
+        # --- SCROLL ---
+        elif action_type == "scroll":
+            direction = action.get("direction", "down")
+            value = action.get("value", 500)
+            if direction == "to_element":
+                try:
+                    await page.locator(str(value)).first.scroll_into_view_if_needed()
+                except Exception:
+                    logger.exception("Scroll to element error")
+                logs.append(f"[OK] Scrolled to element: {value}")
+            elif direction == "down":
+                await page.evaluate(f"window.scrollBy(0, {int(value)})")
+                logs.append(f"[OK] Scrolled down {value}px")
+            elif direction == "up":
+                await page.evaluate(f"window.scrollBy(0, {-int(value)})")
+                logs.append(f"[OK] Scrolled up {value}px")
+            else:
+                logs.append(f"[WARNING] Unknown scroll direction: {direction}")
+
+        # --- WAIT ---
+        elif action_type == "wait":
+            condition = action.get("condition", "time")
+            value = action.get("value", 1000)
+            if condition == "time":
+                await asyncio.sleep(int(value) / 1000.0)
+                logs.append(f"[WAIT] Waited {value}ms")
+            elif condition == "element":
+                await self.wait.wait_for_element(page, str(value), timeout=action_timeout)
+                logs.append(f"[WAIT] Waited for element: {value}")
+            elif condition == "text":
+                await self.wait.wait_for_text(page, str(value), timeout=action_timeout)
+                logs.append(f"[WAIT] Waited for text: {value}")
+            else:
+                logs.append(f"[WARNING] Unknown wait condition: {condition}")
+
+        # --- EXTRACT ---
+        elif action_type == "extract":
+            selector = action.get("field", "")
+            variable = action.get("variable", "extracted_value")
+            attribute = action.get("attribute")
+            extracted = None
+            try:
+                element = await page.query_selector(selector)
+                if element:
+                    extracted = (
+                        await element.get_attribute(attribute)
+                        if attribute
+                        else await element.inner_text()
+                    )
+            except Exception:
+                logger.exception("Extraction error")
+            variables[variable] = extracted
+            logs.append(f"[EXTRACT] Saved '{extracted}' as {{{variable}}}")
+
+        # --- UPLOAD ---
+        elif action_type == "upload":
+            selector = action.get("field", "input[type='file']")
+            file_path = sub(action.get("value", ""))
+            try:
+                if not os.path.exists(file_path):
+                    raise FileNotFoundError(f"File not found: {file_path}")
+                await page.wait_for_selector(selector, timeout=action_timeout)
+                await page.set_input_files(selector, file_path)
+            except Exception:
+                logger.exception("File upload error")
+            logs.append(f"[OK] Uploaded file: {file_path}")
+
+        # --- PRESS KEY ---
+        elif action_type == "press_key":
+            key = action.get("value", "Enter")
+            selector = action.get("field")
+            try:
+                if selector:
+                    await page.focus(selector)
+                await page.keyboard.press(key)
+            except Exception:
+                logger.exception("Key press error")
+            logs.append(f"[OK] Pressed key: {key}")
+
+        # --- ASSERT TEXT ---
+        elif action_type == "assert_text":
+            expected = sub(action.get("value", ""))
+            logs.append(f"[CHECK] Verifying text: '{expected}'...")
+            if await self.wait.wait_for_text(page, expected, timeout=action_timeout):
+                logs.append(f"[ASSERT OK] Found text: '{expected}'")
+            else:
+                raise AssertionError(
+                    f"Expected text not found: '{expected}' after {action_timeout}ms"
+                )
+
+        # --- ASSERT ELEMENT ---
+        elif action_type == "assert_element":
+            selector = sub(action.get("value", ""))
+            if await self.wait.wait_for_element(page, selector, timeout=action_timeout):
+                logs.append(f"[ASSERT OK] Element exists: {selector}")
+            else:
+                raise AssertionError(f"Element not found: {selector}")
+
+        # --- EXECUTE JS ---
+        elif action_type == "execute_js":
+            js_code = action.get("value", "")
+            result = await page.evaluate(js_code)
+            logs.append(f"[JS] Executed JavaScript, result: {repr(result)[:200]}")
+
+        else:
+            logs.append(f"[WARNING] Unknown action type: {action_type}")
+
+        return logs
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    async def _try_heal(
+        self,
+        page: Page,
+        selector: str,
+        action_hint: str,
+        logs: List[str],
+        healer: AISelectorHealer,
+    ) -> str:
+        """Async wrapper around AISelectorHealer; see EnhancedExecutor._try_heal."""
+        if not Config.AI_HEALING_ENABLED:
+            return selector
+
+        logs.append(f"[AI HEALING] Attempting to heal selector: {selector}")
+        html, title = await page.content(), await page.title()
+        # The healer does blocking HTTP — keep it off the event loop.
+        healed = await asyncio.to_thread(
+            healer.heal, html, selector, action_hint,
+            page_url=page.url, page_title=title,
+        )
+        if healed:
+            logs.append(f"[AI HEAL] {selector} → {healed}")
+            return healed
+
+        logs.append("[AI HEAL] Healing failed — retrying with original selector")
+        return selector
+
+    async def _start_trace(self, page: Page, logs: List[str]) -> None:
+        """Begin recording a trace; see EnhancedExecutor._start_trace."""
+        try:
+            await page.context.tracing.start(screenshots=True, snapshots=True, sources=False)
+            self._tracing.add(id(page.context))
+            logs.append("[TRACE] Action is retrying — trace recording started")
+        except Exception:
+            logger.exception("Failed to start tracing")
+
+    async def _stop_trace(self, page: Page, keep: bool) -> Optional[str]:
+        """Stop an active trace, saving it only when *keep* (the test failed)."""
+        if id(page.context) not in self._tracing:
+            return None
+        self._tracing.discard(id(page.context))
+        try:
+            if not keep:
+                await page.context.tracing.stop()
+                return None
+            path = os.path.join(Config.TRACE_DIR, f"trace_{uuid.uuid4()}.zip")
+            os.makedirs(Config.TRACE_DIR, exist_ok=True)
+            await page.context.tracing.stop(path=path)
+            return path
+        except Exception:
+            logger.exception("Failed to stop tracing")
+            return None
+
+    async def _capture_screenshot(
+        self,
+        page: Page,
+        logs: List[str],
+        screenshots: List[str],
+        label: str = "screenshot",
+    ) -> None:
+        path = f"tests/screenshots/{label}_{uuid.uuid4()}.png"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            await page.screenshot(path=path, timeout=3000, animations="disabled")
+            screenshots.append(path)
+            logs.append(f"[SCREENSHOT] {path}")
+        except Exception:
+            logger.exception("Failed to capture screenshot")
+            logs.append(f"[SCREENSHOT FAILED] Could not capture {label} screenshot")
+
+
+# ---------------------------------------------------------------------------
+# Module helpers
+# ---------------------------------------------------------------------------
+
+_VARIABLE_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
+def _replace_variables(text: Any, variables: Dict[str, Any]) -> Any:
+    """Replace {{variable}} placeholders with values from *variables*."""
+    if not isinstance(text, str):
+        return text
+    return _VARIABLE_RE.sub(
+        lambda m: str(variables[m.group(1)]) if m.group(1) in variables else m.group(0),
+        text,
+    )
+
+
+def _failed_result(error: Exception) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "logs": [f"[FATAL ERROR] {error}"],
+        "screenshots": [],
+        "video": None,
+        "video_bytes": 0,
+        "video_bytes_discarded": 0,
+        "console_logs": [],
+        "variables": {},
+        "healing_stats": None,
+        "error_stats": {},
+        "network_stats": {},
+        "har": None,
+        "trace": None,
+    }
@@ -0,0 +1,260 @@
+# agent/browser_pool.py
+
+import atexit
+import logging
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _WarmBrowser:
+    """A pre-launched Chromium process reachable over CDP."""
+
+    def __init__(
+        self, process: subprocess.Popen, user_data_dir: str, port: int, headless: bool
+    ):
+        self.process = process
+        self.user_data_dir = user_data_dir
+        self.port = port
+        self.headless = headless
+        self.uses = 0
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def terminate(self) -> None:
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class BrowserPool:
+    """
+    Long-lived pool of pre-launched Chromium processes.
+
+    Playwright's sync API objects are bound to the thread that created them,
+    and Streamlit runs every rerun on a new thread, so the pool holds plain
+    Chromium *processes* (started with a remote-debugging port) rather than
+    Playwright Browser objects.  A run leases one with lease(), passes the
+    endpoint to BrowserSession(cdp_endpoint=...) and only pays for
+    connect_over_cdp() plus new_context() instead of a cold launch.
+
+    Browsers are health-checked on lease, recycled after *max_uses* leases,
+    and replaced in the background so the pool stays at *size* warm
+    instances.  Top-ups are serialised, so concurrent retires cannot
+    over-spawn.  set_headless() switches the launch mode in place, so one
+    pool serves both modes instead of one warm set per mode.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        headless: bool = True,
+        executable_path: Optional[str] = None,
+    ):
+        self.size = Config.BROWSER_POOL_SIZE if size is None else size
+        self.max_uses = Config.BROWSER_POOL_MAX_USES if max_uses is None else max_uses
+        self.headless = headless
+        self._executable_path = executable_path
+        self._idle: "queue.Queue[_WarmBrowser]" = queue.Queue()
+        self._all: List[_WarmBrowser] = []
+        self._lock = threading.Lock()
+        # Held while topping up, so only one caller counts and spawns at a time.
+        self._fill_lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> "BrowserPool":
+        """Launch browsers until *size* are warm."""
+        with self._fill_lock:
+            while not self._closed and self._idle.qsize() < self.size:
+                self._idle.put(self._spawn())
+        return self
+
+    def set_headless(self, headless: bool) -> None:
+        """Switch launch mode, replacing the idle browsers of the old one."""
+        with self._fill_lock:
+            if headless == self.headless:
+                return
+            self.headless = headless
+            stale = []
+            while True:
+                try:
+                    stale.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+        for browser in stale:
+            self._retire(browser)
+        self.start()
+
+    def close(self) -> None:
+        """Terminate every browser owned by the pool."""
+        with self._lock:
+            self._closed = True
+            browsers, self._all = self._all, []
+        for browser in browsers:
+            browser.terminate()
+
+    @property
+    def executable_path(self) -> str:
+        if self._executable_path is None:
+            with sync_playwright() as p:
+                self._executable_path = p.chromium.executable_path
+        return self._executable_path
+
+    def _spawn(self) -> _WarmBrowser:
+        headless = self.headless
+        user_data_dir = tempfile.mkdtemp(prefix="agent-pool-")
+        args = [
+            self.executable_path,
+            "--remote-debugging-port=0",
+            f"--user-data-dir={user_data_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-dev-shm-usage",
+        ]
+        if headless:
+            args.append("--headless=new")
+        args.append("about:blank")
+
+        process = subprocess.Popen(
+            args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            port = self._read_devtools_port(user_data_dir, process)
+        except Exception:
+            process.kill()
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+            raise
+
+        browser = _WarmBrowser(process, user_data_dir, port, headless)
+        with self._lock:
+            self._all.append(browser)
+        logger.info("Browser pool: launched warm browser on port %d", port)
+        return browser
+
+    @staticmethod
+    def _read_devtools_port(
+        user_data_dir: str, process: subprocess.Popen, timeout: float = 15.0
+    ) -> int:
+        """Chromium writes its chosen debugging port to DevToolsActivePort."""
+        port_file = Path(user_data_dir) / "DevToolsActivePort"
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("Chromium exited during pool launch")
+            if port_file.exists():
+                first_line = port_file.read_text().splitlines()[:1]
+                if first_line and first_line[0].strip().isdigit():
+                    return int(first_line[0])
+            time.sleep(0.05)
+        raise TimeoutError("Chromium did not report a debugging port")
+
+    # ------------------------------------------------------------------
+    # Health and recycling
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def is_healthy(browser: _WarmBrowser) -> bool:
+        """Process is running and its CDP endpoint answers."""
+        if browser.process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{browser.endpoint}/json/version", timeout=2):
+                return True
+        except Exception:
+            return False
+
+    def _retire(self, browser: _WarmBrowser) -> None:
+        with self._lock:
+            if browser in self._all:
+                self._all.remove(browser)
+        browser.terminate()
+
+    def _replenish_async(self) -> None:
+        """Top the pool back up without blocking the caller."""
+        def _fill():
+            try:
+                if not self._closed:
+                    self.start()
+            except Exception:
+                logger.exception("Browser pool: failed to launch replacement")
+
+        threading.Thread(target=_fill, daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # Leasing
+    # ------------------------------------------------------------------
+
+    def _acquire(self) -> _WarmBrowser:
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                # All warm browsers are busy — fall back to launching one.
+                return self._spawn()
+            if browser.headless != self.headless:
+                self._retire(browser)
+                continue
+            if self.is_healthy(browser):
+                return browser
+            logger.warning("Browser pool: dropping unhealthy browser on port %d", browser.port)
+            self._retire(browser)
+            self._replenish_async()
+
+    def _release(self, browser: _WarmBrowser) -> None:
+        browser.uses += 1
+        if (
+            self._closed
+            or browser.uses >= self.max_uses
+            or browser.headless != self.headless
+            or self._idle.qsize() >= self.size
+            or not self.is_healthy(browser)
+        ):
+            self._retire(browser)
+            self._replenish_async()
+        else:
+            self._idle.put(browser)
+
+    @contextmanager
+    def lease(self) -> Iterator[str]:
+        """
+        Borrow a warm browser and yield its CDP endpoint.
+
+        The browser goes back to the pool (or is recycled) on exit.
+        """
+        browser = self._acquire()
+        try:
+            yield browser.endpoint
+        finally:
+            self._release(browser)
+
+    def get_stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "total": len(self._all),
+            "max_uses": self.max_uses,
+        }
@@ -0,0 +1,142 @@
+# agent/browser_session.py
+
+import asyncio
+import logging
+import sys
+from typing import Any, Optional
+
+from playwright.sync_api import Browser, BrowserContext, Playwright, sync_playwright
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserSession:
+    """
+    One sync_playwright() instance and one Chromium browser shared by many
+    tests.  Each test gets an isolated BrowserContext from new_context(), so
+    cookies, storage and pages never leak between tests while the cost of
+    launching Chromium is paid once per session instead of once per test.
+
+    The browser is launched lazily on the first new_context() call and is
+    relaunched automatically if it has crashed or been disconnected.  With
+    *cdp_endpoint* the session connects to an already-running Chromium
+    (see BrowserPool) instead of launching one, and falls back to a local
+    launch if that browser can no longer be reached.
+
+    Usage:
+        with BrowserSession(headless=True) as session:
+            context = session.new_context(viewport={...})
+            ...
+            context.close()
+    """
+
+    def __init__(
+        self,
+        headless: Optional[bool] = None,
+        slow_mo: Optional[int] = None,
+        cdp_endpoint: Optional[str] = None,
+    ):
+        self.cdp_endpoint = cdp_endpoint
+        self.headless = Config.HEADLESS_MODE if headless is None else headless
+        self.slow_mo = (0 if self.headless else Config.SLOW_MO) if slow_mo is None else slow_mo
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self.launch_count = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def __enter__(self) -> "BrowserSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def is_alive(self) -> bool:
+        """True if the browser is launched and still connected."""
+        return self._browser is not None and self._browser.is_connected()
+
+    @property
+    def browser(self) -> Browser:
+        """The live browser, (re)launching it if needed."""
+        if not self.is_alive():
+            self._launch()
+        return self._browser
+
+    def _launch(self) -> None:
+        if self._browser is not None:
+            logger.warning("Browser disconnected — relaunching")
+            self._close_browser()
+
+        if self._playwright is None:
+            # Must be set before sync_playwright starts on Windows
+            if sys.platform == "win32":
+                asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+            self._playwright = sync_playwright().start()
+
+        if self.cdp_endpoint:
+            try:
+                # Closing a connected browser only disconnects; the process
+                # stays warm for its pool.
+                self._browser = self._playwright.chromium.connect_over_cdp(
+                    self.cdp_endpoint, slow_mo=self.slow_mo
+                )
+            except Exception as exc:
+                # The pooled process is gone.  Launch locally from now on
+                # instead of retrying the dead endpoint; the pool replaces
+                # the process when the lease is returned.
+                logger.warning(
+                    "CDP endpoint %s unreachable (%s) — launching a local browser",
+                    self.cdp_endpoint, exc,
+                )
+                self.cdp_endpoint = None
+        if not self.cdp_endpoint:
+            self._browser = self._playwright.chromium.launch(
+                headless=self.headless, slow_mo=self.slow_mo
+            )
+        self.launch_count += 1
+
+    def relaunch(self) -> None:
+        """Force a fresh browser (e.g. after a crash was detected)."""
+        self._close_browser()
+        self._launch()
+
+    def _close_browser(self) -> None:
+        if self._browser is None:
+            return
+        try:
+            self._browser.close()
+        except Exception:
+            logger.debug("Ignoring error while closing browser", exc_info=True)
+        self._browser = None
+
+    def close(self) -> None:
+        """Close the browser and stop Playwright."""
+        self._close_browser()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                logger.debug("Ignoring error while stopping Playwright", exc_info=True)
+            self._playwright = None
+
+    # ------------------------------------------------------------------
+    # Contexts
+    # ------------------------------------------------------------------
+
+    def new_context(self, **kwargs: Any) -> BrowserContext:
+        """
+        Create an isolated context.  If the browser died between tests the
+        first attempt fails fast; relaunch once and try again.
+        """
+        try:
+            return self.browser.new_context(**kwargs)
+        except Exception:
+            if self.is_alive():
+                raise
+            logger.warning("Browser crashed while creating a context — relaunching")
+            self.relaunch()
+            return self.browser.new_context(**kwargs)
@@ -0,0 +1,475 @@
+# agent/cache_backends.py
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Every live backend, so buffered writes are flushed at interpreter exit
+# without atexit keeping each instance alive.
+_live_backends: "weakref.WeakSet[CacheBackend]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_backends():
+    for backend in list(_live_backends):
+        backend.flush()
+
+
+class CacheBackend(ABC):
+    """
+    Storage for SelectorCache entries, keyed by the cache key.  Entries are
+    plain dicts; "hits" is maintained by the backend via increment_hits()
+    so concurrent users add to the counter instead of overwriting it.
+
+    Copies of one heal stored under several keys share a "group" field
+    (an entry without one is its own group); size() counts each group
+    once, so the entry limit is not used up by the copies.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, entry: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def increment_hits(self, key: str, count: int = 1, used_at: Optional[str] = None) -> None:
+        """Add *count* hits and move last_used forward to *used_at*."""
+
+    @abstractmethod
+    def delete_many(self, keys: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    def size(self) -> Tuple[int, int]:
+        """(distinct entry groups, approximate bytes) currently stored."""
+
+    @abstractmethod
+    def usage(self) -> List[Tuple[str, str, int, str, int]]:
+        """(key, group, hits, last_used, bytes) for every entry — eviction input."""
+
+    @abstractmethod
+    def delete_older_than(self, cutoff_iso: str) -> int:
+        """Drop entries whose timestamp is before *cutoff_iso*; return how many."""
+
+    @abstractmethod
+    def entries(self) -> Dict[str, Dict]:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def flush(self) -> None:
+        """Persist anything still buffered (no-op for write-through backends)."""
+
+    @property
+    @abstractmethod
+    def location(self) -> str:
+        ...
+
+
+# ---------------------------------------------------------------------------
+# JSON file (write-behind)
+# ---------------------------------------------------------------------------
+
+class JsonCacheBackend(CacheBackend):
+    """
+    Whole cache in one JSON file, held in memory.  get() never touches the
+    disk; mutations are flushed every *flush_every* dirty entries, after
+    *flush_interval_ms*, and at exit.  A flush re-reads the file, applies
+    this instance's changes and hit deltas on top and replaces it
+    atomically, so concurrent writers keep each other's entries.
+    """
+
+    name = "json"
+
+    def __init__(self, cache_file: str, flush_every: Optional[int] = None,
+                 flush_interval_ms: Optional[int] = None):
+        self.cache_file = cache_file
+        self.flush_every = Config.SELECTOR_CACHE_FLUSH_EVERY if flush_every is None else flush_every
+        self.flush_interval_ms = (
+            Config.SELECTOR_CACHE_FLUSH_INTERVAL_MS if flush_interval_ms is None
+            else flush_interval_ms
+        )
+        self.cache: Dict[str, Dict] = self._load()
+
+        # Pending changes since the last flush.
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._hit_deltas: Dict[str, int] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        _live_backends.add(self)
+
+    @property
+    def location(self) -> str:
+        return self.cache_file
+
+    @staticmethod
+    def _entry_bytes(entry: Dict) -> int:
+        return len(json.dumps(entry, separators=(',', ':')))
+
+    def _load(self) -> Dict[str, Dict]:
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Cache load error: {e}")
+        return {}
+
+    def _write(self, data: Dict[str, Dict]) -> None:
+        dir_name = os.path.dirname(self.cache_file)
+        if dir_name:  # guard against empty string when no directory in path
+            os.makedirs(dir_name, exist_ok=True)
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_file, self.cache_file)
+
+    def _maybe_flush(self) -> None:
+        elapsed_ms = (time.monotonic() - self._last_flush) * 1000
+        if (len(self._dirty) + len(self._deleted) >= self.flush_every
+                or elapsed_ms >= self.flush_interval_ms):
+            self.flush()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self.cache.get(key)
+
+    def put(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self.cache[key] = entry
+            self._dirty.add(key)
+            self._deleted.discard(key)
+            self._hit_deltas.pop(key, None)
+            self._maybe_flush()
+
+    def delete(self, key: str) -> None:
+        self.delete_many([key])
+
+    def increment_hits(self, key: str, count: int = 1, used_at: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                return
+            entry['hits'] = entry.get('hits', 0) + count
+            if used_at:
+                entry['last_used'] = used_at
+            # Dirty entries are written whole, hits included.
+            if key not in self._dirty:
+                self._hit_deltas[key] = self._hit_deltas.get(key, 0) + count
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self.cache.pop(key, None)
+                self._deleted.add(key)
+                self._dirty.discard(key)
+                self._hit_deltas.pop(key, None)
+            self._maybe_flush()
+
+    def size(self) -> Tuple[int, int]:
+        with self._lock:
+            groups = {e.get('group', key) for key, e in self.cache.items()}
+            return len(groups), sum(self._entry_bytes(e) for e in self.cache.values())
+
+    def usage(self) -> List[Tuple[str, str, int, str, int]]:
+        with self._lock:
+            return [
+                (key, e.get('group', key), e.get('hits', 0),
+                 e.get('last_used', e['timestamp']), self._entry_bytes(e))
+                for key, e in self.cache.items()
+            ]
+
+    def delete_older_than(self, cutoff_iso: str) -> int:
+        with self._lock:
+            expired = [k for k, e in self.cache.items() if e['timestamp'] < cutoff_iso]
+            if expired:
+                self.delete_many(expired)
+                self.flush()
+            return len(expired)
+
+    def entries(self) -> Dict[str, Dict]:
+        with self._lock:
+            return dict(self.cache)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.cache = {}
+            self._dirty.clear()
+            self._deleted.clear()
+            self._hit_deltas.clear()
+            try:
+                self._write({})
+            except Exception as e:
+                print(f"Cache save error: {e}")
+
+    def flush(self) -> None:
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not (self._dirty or self._deleted or self._hit_deltas):
+                return
+            try:
+                merged = self._load()
+                for key in self._deleted:
+                    merged.pop(key, None)
+                for key in self._dirty:
+                    if key in self.cache:
+                        merged[key] = self.cache[key]
+                for key, delta in self._hit_deltas.items():
+                    if key in merged and key not in self._dirty:
+                        on_disk = merged[key]
+                        on_disk['hits'] = on_disk.get('hits', 0) + delta
+                        last_used = self.cache.get(key, {}).get('last_used')
+                        if last_used and last_used > on_disk.get('last_used', ''):
+                            on_disk['last_used'] = last_used
+                self._write(merged)
+            except Exception as e:
+                print(f"Cache save error: {e}")
+                return
+
+            # Pick up entries other processes flushed in the meantime.
+            self.cache = merged
+            self._dirty.clear()
+            self._deleted.clear()
+            self._hit_deltas.clear()
+
+
+# ---------------------------------------------------------------------------
+# SQLite (shared by many processes)
+# ---------------------------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS selector_cache (
+    key        TEXT PRIMARY KEY,
+    domain     TEXT NOT NULL,
+    timestamp  TEXT NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0,
+    last_used  TEXT,
+    entry      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_selector_cache_domain ON selector_cache (domain);
+CREATE INDEX IF NOT EXISTS idx_selector_cache_timestamp ON selector_cache (timestamp);
+"""
+
+# PRAGMA user_version after the one-time import of the JSON cache file.
+_SCHEMA_VERSION = 1
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    One row per entry in a WAL-mode SQLite database, so any number of
+    executor processes on a host can read and write concurrently without
+    loading the whole cache.  Lookups go through the primary key, TTL
+    expiry is a single indexed DELETE, and hit counts are buffered and
+    applied as atomic `hits = hits + n` updates on flush().
+
+    On first use, entries from the JSON cache file (*migrate_from*) are
+    imported.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str, migrate_from: Optional[str] = None):
+        self.db_path = db_path
+        dir_name = os.path.dirname(db_path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._hit_deltas: Dict[str, int] = {}
+        self._last_used: Dict[str, str] = {}
+        self._conn = sqlite3.connect(
+            db_path, timeout=Config.SELECTOR_CACHE_DB_TIMEOUT_MS / 1000,
+            check_same_thread=False, isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(selector_cache)")}
+        if "last_used" not in columns:
+            # Databases created before eviction tracked recency.
+            self._conn.execute("ALTER TABLE selector_cache ADD COLUMN last_used TEXT")
+        self._migrate(migrate_from)
+        _live_backends.add(self)
+
+    @property
+    def location(self) -> str:
+        return self.db_path
+
+    def _migrate(self, json_file: Optional[str]) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= _SCHEMA_VERSION:
+            return
+        imported = 0
+        if json_file and os.path.exists(json_file):
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    for key, entry in legacy.items():
+                        cursor = self._conn.execute(
+                            "INSERT OR IGNORE INTO selector_cache "
+                            "(key, domain, timestamp, hits, last_used, entry) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            self._row(key, entry),
+                        )
+                        imported += cursor.rowcount
+            except Exception:
+                logger.exception("Selector cache migration from %s failed", json_file)
+                return
+        self._conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+        if imported:
+            logger.info("Imported %d selector cache entries from %s", imported, json_file)
+
+    @staticmethod
+    def _row(key: str, entry: Dict):
+        body = {k: v for k, v in entry.items() if k not in ('hits', 'last_used')}
+        return (
+            key,
+            entry.get('url_pattern', 'unknown'),
+            entry['timestamp'],
+            entry.get('hits', 0),
+            entry.get('last_used', entry['timestamp']),
+            json.dumps(body),
+        )
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hits, last_used, entry FROM selector_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = json.loads(row[2])
+            entry['hits'] = row[0] + self._hit_deltas.get(key, 0)
+            entry['last_used'] = self._last_used.get(key, row[1])
+            return entry
+
+    def put(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._hit_deltas.pop(key, None)
+            self._last_used.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO selector_cache "
+                "(key, domain, timestamp, hits, last_used, entry) VALUES (?, ?, ?, ?, ?, ?)",
+                self._row(key, entry),
+            )
+
+    def delete(self, key: str) -> None:
+        self.delete_many([key])
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._hit_deltas.pop(key, None)
+                self._last_used.pop(key, None)
+            self._conn.executemany(
+                "DELETE FROM selector_cache WHERE key = ?", [(key,) for key in keys]
+            )
+
+    def increment_hits(self, key: str, count: int = 1, used_at: Optional[str] = None) -> None:
+        with self._lock:
+            self._hit_deltas[key] = self._hit_deltas.get(key, 0) + count
+            if used_at:
+                self._last_used[key] = used_at
+
+    def size(self) -> Tuple[int, int]:
+        with self._lock:
+            count, nbytes = self._conn.execute(
+                "SELECT COUNT(DISTINCT COALESCE(json_extract(entry, '$.group'), key)), "
+                "COALESCE(SUM(LENGTH(entry)), 0) FROM selector_cache"
+            ).fetchone()
+            return count, nbytes
+
+    def usage(self) -> List[Tuple[str, str, int, str, int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, COALESCE(json_extract(entry, '$.group'), key), hits, "
+                "COALESCE(last_used, timestamp), LENGTH(entry) FROM selector_cache"
+            ).fetchall()
+            return [
+                (key, group, hits + self._hit_deltas.get(key, 0),
+                 self._last_used.get(key, last_used), nbytes)
+                for key, group, hits, last_used, nbytes in rows
+            ]
+
+    def delete_older_than(self, cutoff_iso: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM selector_cache WHERE timestamp < ?", (cutoff_iso,)
+            ).rowcount
+
+    def entries(self) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, hits, last_used, entry FROM selector_cache"
+            ).fetchall()
+            result = {}
+            for key, hits, last_used, body in rows:
+                entry = json.loads(body)
+                entry['hits'] = hits + self._hit_deltas.get(key, 0)
+                entry['last_used'] = self._last_used.get(key, last_used)
+                result[key] = entry
+            return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hit_deltas.clear()
+            self._last_used.clear()
+            self._conn.execute("DELETE FROM selector_cache")
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._hit_deltas:
+                return
+            try:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    self._conn.executemany(
+                        "UPDATE selector_cache SET hits = hits + ?, "
+                        "last_used = MAX(COALESCE(last_used, ''), ?) WHERE key = ?",
+                        [
+                            (delta, self._last_used.get(key, ''), key)
+                            for key, delta in self._hit_deltas.items()
+                        ],
+                    )
+                self._hit_deltas.clear()
+                self._last_used.clear()
+            except Exception:
+                logger.exception("Selector cache hit flush failed")
+
+
+def create_backend(name: Optional[str] = None, cache_file: Optional[str] = None,
+                   db_path: Optional[str] = None) -> CacheBackend:
+    """Backend selected by *name* (default Config.SELECTOR_CACHE_BACKEND)."""
+    name = (name or Config.SELECTOR_CACHE_BACKEND).lower()
+    cache_file = cache_file or Config.SELECTOR_CACHE_FILE
+    if name == "sqlite":
+        return SQLiteCacheBackend(db_path or Config.SELECTOR_CACHE_DB, migrate_from=cache_file)
+    if name != "json":
+        logger.warning("Unknown SELECTOR_CACHE_BACKEND %r — using json", name)
+    return JsonCacheBackend(cache_file)
@@ -34,6 +34,12 @@ def _int_env(key: str, default: int) -> int:
         return default
 
 
+def _list_env(key: str, default: str) -> list[str]:
+    """Read a comma-separated list from an env var (blank items dropped)."""
+    raw = os.getenv(key, default)
+    return [item.strip().lower() for item in raw.split(",") if item.strip()]
+
+
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
@@ -54,8 +60,19 @@ class Config:
     # API
     # ------------------------------------------------------------------
     GROK_API_KEY: str | None = os.getenv("GROK_API_KEY")
-    GROK_API_URL: str = "https://api.x.ai/v1/chat/completions"
-    GROK_MODEL: str = "grok-beta"
+    # Override the URL to point the client at a local stand-in server.
+    GROK_API_URL: str = os.getenv("GROK_API_URL", "https://api.x.ai/v1/chat/completions")
+    GROK_MODEL: str = os.getenv("GROK_MODEL", "grok-beta")
+    # Shared keep-alive connection pool (see grok_client.py).
+    GROK_POOL_SIZE: int          = _int_env("GROK_POOL_SIZE", 10)
+    GROK_CONNECT_TIMEOUT_MS: int = _int_env("GROK_CONNECT_TIMEOUT_MS", 5_000)
+    GROK_READ_TIMEOUT_MS: int    = _int_env("GROK_READ_TIMEOUT_MS", 15_000)
+    # Instruction parsing sits in front of the UI, so it gives up sooner.
+    GROK_PARSE_TIMEOUT_MS: int   = _int_env("GROK_PARSE_TIMEOUT_MS", 10_000)
+    # Retries on 429/5xx and connection errors, with exponential backoff
+    # starting at GROK_RETRY_BACKOFF_MS (Retry-After wins when sent).
+    GROK_MAX_RETRIES: int        = _int_env("GROK_MAX_RETRIES", 3)
+    GROK_RETRY_BACKOFF_MS: int   = _int_env("GROK_RETRY_BACKOFF_MS", 500)
 
     # ------------------------------------------------------------------
     # Timeouts — all values in milliseconds (Playwright convention)
@@ -83,6 +100,25 @@ class Config:
     SMART_WAIT_ENABLED: bool    = _bool_env("SMART_WAIT_ENABLED",    True)
     WAIT_FOR_ANIMATIONS: bool   = _bool_env("WAIT_FOR_ANIMATIONS",   True)
     WAIT_FOR_NETWORK_IDLE: bool = _bool_env("WAIT_FOR_NETWORK_IDLE", True)
+    # The page counts as idle once no request has been in flight for this
+    # long.  URLs containing any of the ignore patterns (long-polling and
+    # socket endpoints) are never counted as in flight.
+    NETWORK_IDLE_QUIET_MS: int = _int_env("NETWORK_IDLE_QUIET_MS", 500)
+    NETWORK_IDLE_IGNORE_PATTERNS: list[str] = _list_env(
+        "NETWORK_IDLE_IGNORE_PATTERNS",
+        "socket.io,sockjs,signalr,longpoll,long-poll,cometd",
+    )
+    # Learned post-action waits: per domain and action type, the idle wait
+    # after goto/click is capped at p95 of past settle times plus
+    # NETWORK_IDLE_QUIET_MS plus a margin (never above the 2000 ms default),
+    # and skipped for actions that never triggered a request.  Timed-out
+    # waits count as samples at their timeout.  Needs
+    # SETTLE_MODEL_MIN_SAMPLES observations before it replaces the defaults.
+    SETTLE_MODEL_ENABLED: bool     = _bool_env("SETTLE_MODEL_ENABLED", True)
+    SETTLE_MODEL_PATH: str         = os.getenv("SETTLE_MODEL_PATH", "tests/settle_times.json")
+    SETTLE_MODEL_MARGIN_MS: int    = _int_env("SETTLE_MODEL_MARGIN_MS", 250)
+    SETTLE_MODEL_MIN_SAMPLES: int  = _int_env("SETTLE_MODEL_MIN_SAMPLES", 5)
+    SETTLE_MODEL_MAX_SAMPLES: int  = _int_env("SETTLE_MODEL_MAX_SAMPLES", 50)
 
     # ------------------------------------------------------------------
     # AI healing
@@ -90,8 +126,54 @@ class Config:
     AI_HEALING_ENABLED: bool     = _bool_env("AI_HEALING_ENABLED",     True)
     VISUAL_HEALING_ENABLED: bool = _bool_env("VISUAL_HEALING_ENABLED", False)
     SELECTOR_CACHE_ENABLED: bool = _bool_env("SELECTOR_CACHE_ENABLED", True)
+    # A cached healed selector is raced against the original before the
+    # element wait; it is dropped after losing this many races in a row.
+    SELECTOR_CACHE_STALE_AFTER: int = _int_env("SELECTOR_CACHE_STALE_AFTER", 3)
+    # json: one write-behind JSON file.  sqlite: a WAL-mode database that
+    # many processes can share; the JSON file is imported on first use.
+    SELECTOR_CACHE_BACKEND: str = os.getenv("SELECTOR_CACHE_BACKEND", "json").lower()
+    SELECTOR_CACHE_FILE: str    = os.getenv("SELECTOR_CACHE_FILE", "tests/selector_cache.json")
+    SELECTOR_CACHE_DB: str      = os.getenv("SELECTOR_CACHE_DB", "tests/selector_cache.db")
+    # How long a SQLite writer waits for another process's lock.
+    SELECTOR_CACHE_DB_TIMEOUT_MS: int = _int_env("SELECTOR_CACHE_DB_TIMEOUT_MS", 5_000)
+    # Key healed selectors by page structure (URL path template, title and
+    # an in-page hash of the interactive elements) as well as by domain;
+    # lookups fall back from the most to the least specific key.  Costs one
+    # page.evaluate per cache lookup.
+    SELECTOR_CACHE_FINGERPRINT_KEYS: bool = _bool_env("SELECTOR_CACHE_FINGERPRINT_KEYS", False)
+    # Fingerprints of the elements actions touched, one JSON file per domain,
+    # used to re-find a broken selector's element locally before AI healing.
+    ELEMENT_INDEX_ENABLED: bool        = _bool_env("ELEMENT_INDEX_ENABLED", True)
+    ELEMENT_INDEX_DIR: str             = os.getenv("ELEMENT_INDEX_DIR", "tests/element_index/")
+    ELEMENT_INDEX_MAX_PER_DOMAIN: int  = _int_env("ELEMENT_INDEX_MAX_PER_DOMAIN", 500)
+    # Minimum match score (out of 130) for a fingerprint heal to be used.
+    ELEMENT_INDEX_MIN_SCORE: int       = _int_env("ELEMENT_INDEX_MIN_SCORE", 45)
+    # Selectors every healing strategy failed on are not retried (no AI
+    # call) until this many minutes have passed.
+    NEGATIVE_CACHE_TTL_MINUTES: int = _int_env("NEGATIVE_CACHE_TTL_MINUTES", 15)
+    # Size bounds; beyond either, least-used/least-recent entries are evicted.
+    SELECTOR_CACHE_MAX_ENTRIES: int = _int_env("SELECTOR_CACHE_MAX_ENTRIES", 5_000)
+    SELECTOR_CACHE_MAX_BYTES: int   = _int_env("SELECTOR_CACHE_MAX_BYTES", 5_000_000)
+    # Write-behind persistence: pending cache changes are flushed to disk
+    # after this many dirty entries or this many ms, and at exit.
+    SELECTOR_CACHE_FLUSH_EVERY: int       = _int_env("SELECTOR_CACHE_FLUSH_EVERY", 20)
+    SELECTOR_CACHE_FLUSH_INTERVAL_MS: int = _int_env("SELECTOR_CACHE_FLUSH_INTERVAL_MS", 5_000)
     MAX_HEALING_ATTEMPTS: int    = _int_env("MAX_HEALING_ATTEMPTS",    2)
 
+    # ------------------------------------------------------------------
+    # Session snapshots — reuse login state across tests
+    # ------------------------------------------------------------------
+    SESSION_CACHE_ENABLED: bool    = _bool_env("SESSION_CACHE_ENABLED", True)
+    SESSION_CACHE_DIR: str         = os.getenv("SESSION_CACHE_DIR", "tests/sessions/")
+    SESSION_CACHE_TTL_MINUTES: int = _int_env("SESSION_CACHE_TTL_MINUTES", 30)
+
+    # ------------------------------------------------------------------
+    # Prefix sharing — run identical leading steps of a batch only once
+    # ------------------------------------------------------------------
+    # Off by default: forked tests keep cookies/localStorage but lose
+    # sessionStorage and in-page state at the fork point.
+    PREFIX_SHARING_ENABLED: bool = _bool_env("PREFIX_SHARING_ENABLED", False)
+
     # ------------------------------------------------------------------
     # Screenshots
     # ------------------------------------------------------------------
@@ -104,6 +186,33 @@ class Config:
     # ------------------------------------------------------------------
     VIDEO_RECORDING_ENABLED: bool = _bool_env("VIDEO_RECORDING_ENABLED", True)
     VIDEO_DIR: str                = os.getenv("VIDEO_DIR", "tests/videos/")
+    # off | on | retain-on-failure | on-first-retry.  Defaults to "on" or
+    # "off" from VIDEO_RECORDING_ENABLED so existing setups keep working.
+    VIDEO_MODE: str = os.getenv(
+        "VIDEO_MODE", "on" if VIDEO_RECORDING_ENABLED else "off"
+    ).strip().lower()
+
+    # Whole-test retries run by the batch graphs after a failed test
+    # (independent of MAX_RETRIES, which retries single actions).
+    TEST_RETRIES: int = _int_env("TEST_RETRIES", 0)
+
+    @classmethod
+    def should_record_video(cls, attempt: int = 1, mode: str | None = None) -> bool:
+        """Whether test attempt *attempt* (1 = first run) records video."""
+        mode = mode or cls.VIDEO_MODE
+        if mode in ("on", "retain-on-failure"):
+            return True
+        if mode == "on-first-retry":
+            return attempt == 2
+        return False
+
+    # ------------------------------------------------------------------
+    # Tracing
+    # ------------------------------------------------------------------
+    # Started only when an action enters its retry path; the trace zip is
+    # kept only if the test ultimately fails.
+    TRACE_ON_RETRY: bool = _bool_env("TRACE_ON_RETRY", True)
+    TRACE_DIR: str       = os.getenv("TRACE_DIR", "tests/traces/")
 
     # ------------------------------------------------------------------
     # Reporting
@@ -122,6 +231,44 @@ class Config:
     VIEWPORT_WIDTH: int    = _int_env("VIEWPORT_WIDTH",  1280)
     VIEWPORT_HEIGHT: int   = _int_env("VIEWPORT_HEIGHT",  720)
 
+    # ------------------------------------------------------------------
+    # Network resource blocking (page.route profile)
+    # ------------------------------------------------------------------
+    # Requests of these Playwright resource types, or to these domains (and
+    # their subdomains), are aborted before they leave the browser.
+    RESOURCE_BLOCKING_ENABLED: bool = _bool_env("RESOURCE_BLOCKING_ENABLED", False)
+    BLOCK_RESOURCE_TYPES: list[str] = _list_env("BLOCK_RESOURCE_TYPES", "image,font,media")
+    BLOCK_DOMAINS: list[str]        = _list_env(
+        "BLOCK_DOMAINS",
+        "google-analytics.com,googletagmanager.com,doubleclick.net,"
+        "facebook.net,hotjar.com,segment.io,mixpanel.com",
+    )
+
+    # ------------------------------------------------------------------
+    # HAR record / replay
+    # ------------------------------------------------------------------
+    # off: live network.  record: save each test's traffic to a HAR next to
+    # its report.  replay: serve responses from that HAR (no network).
+    HAR_MODE: str      = os.getenv("HAR_MODE", "off").strip().lower()
+    # Replay policy for requests missing from the HAR: "abort" or "fallback"
+    # (fallback lets them through to the live network).
+    HAR_NOT_FOUND: str = os.getenv("HAR_NOT_FOUND", "abort").strip().lower()
+
+    # ------------------------------------------------------------------
+    # Parallel execution
+    # ------------------------------------------------------------------
+    # Worker processes used by ParallelExecutor; each runs its own browser.
+    # 1 disables the worker pool and runs action sets sequentially.
+    MAX_WORKERS: int = _int_env("MAX_WORKERS", os.cpu_count() or 1)
+
+    # ------------------------------------------------------------------
+    # Browser pool (pre-warmed browsers for the interactive UI)
+    # ------------------------------------------------------------------
+    BROWSER_POOL_ENABLED: bool  = _bool_env("BROWSER_POOL_ENABLED", True)
+    BROWSER_POOL_SIZE: int      = _int_env("BROWSER_POOL_SIZE", 2)
+    # Recycle a warm browser after this many runs to bound memory growth.
+    BROWSER_POOL_MAX_USES: int  = _int_env("BROWSER_POOL_MAX_USES", 20)
+
     # ------------------------------------------------------------------
     # Advanced features
     # ------------------------------------------------------------------
@@ -181,12 +328,103 @@ class Config:
             )
             valid = False
 
-        if cls.VIDEO_RECORDING_ENABLED:
+        if cls.VIDEO_MODE not in ("off", "on", "retain-on-failure", "on-first-retry"):
+            logger.warning(
+                "VIDEO_MODE %r is not one of off/on/retain-on-failure/on-first-retry.",
+                cls.VIDEO_MODE,
+            )
+            valid = False
+
+        if cls.VIDEO_MODE == "on-first-retry" and cls.TEST_RETRIES < 1:
+            logger.warning(
+                "VIDEO_MODE is on-first-retry but TEST_RETRIES is %d — "
+                "no test is ever retried, so nothing will be recorded.",
+                cls.TEST_RETRIES,
+            )
+
+        if cls.VIDEO_MODE != "off":
             video_path = Path(cls.VIDEO_DIR)
             if not video_path.exists():
                 logger.info("VIDEO_DIR %r does not exist — creating it.", cls.VIDEO_DIR)
                 video_path.mkdir(parents=True, exist_ok=True)
 
+        if cls.MAX_WORKERS < 1:
+            logger.warning(
+                "MAX_WORKERS is %d; ParallelExecutor will run sequentially. "
+                "Set MAX_WORKERS to 1 or more.",
+                cls.MAX_WORKERS,
+            )
+            valid = False
+
+        if cls.NETWORK_IDLE_QUIET_MS < 0:
+            logger.warning(
+                "NETWORK_IDLE_QUIET_MS is %d; it must be 0 or more.",
+                cls.NETWORK_IDLE_QUIET_MS,
+            )
+            valid = False
+
+        if cls.SETTLE_MODEL_MIN_SAMPLES < 1 or cls.SETTLE_MODEL_MAX_SAMPLES < cls.SETTLE_MODEL_MIN_SAMPLES:
+            logger.warning(
+                "SETTLE_MODEL_MIN_SAMPLES (%d) must be at least 1 and no more than "
+                "SETTLE_MODEL_MAX_SAMPLES (%d).",
+                cls.SETTLE_MODEL_MIN_SAMPLES,
+                cls.SETTLE_MODEL_MAX_SAMPLES,
+            )
+            valid = False
+
+        if cls.SELECTOR_CACHE_BACKEND not in ("json", "sqlite"):
+            logger.warning(
+                "SELECTOR_CACHE_BACKEND %r is not one of json/sqlite.",
+                cls.SELECTOR_CACHE_BACKEND,
+            )
+            valid = False
+
+        if cls.SELECTOR_CACHE_MAX_ENTRIES < 1 or cls.SELECTOR_CACHE_MAX_BYTES < 1:
+            logger.warning(
+                "SELECTOR_CACHE_MAX_ENTRIES (%d) and SELECTOR_CACHE_MAX_BYTES (%d) "
+                "must both be at least 1.",
+                cls.SELECTOR_CACHE_MAX_ENTRIES,
+                cls.SELECTOR_CACHE_MAX_BYTES,
+            )
+            valid = False
+
+        if cls.ELEMENT_INDEX_MAX_PER_DOMAIN < 1 or not 0 <= cls.ELEMENT_INDEX_MIN_SCORE <= 130:
+            logger.warning(
+                "ELEMENT_INDEX_MAX_PER_DOMAIN (%d) must be at least 1 and "
+                "ELEMENT_INDEX_MIN_SCORE (%d) between 0 and 130.",
+                cls.ELEMENT_INDEX_MAX_PER_DOMAIN,
+                cls.ELEMENT_INDEX_MIN_SCORE,
+            )
+            valid = False
+
+        if cls.GROK_POOL_SIZE < 1 or cls.GROK_MAX_RETRIES < 0 or cls.GROK_RETRY_BACKOFF_MS < 0:
+            logger.warning(
+                "GROK_POOL_SIZE (%d) must be at least 1; GROK_MAX_RETRIES (%d) and "
+                "GROK_RETRY_BACKOFF_MS (%d) must not be negative.",
+                cls.GROK_POOL_SIZE,
+                cls.GROK_MAX_RETRIES,
+                cls.GROK_RETRY_BACKOFF_MS,
+            )
+            valid = False
+
+        if min(cls.GROK_CONNECT_TIMEOUT_MS, cls.GROK_READ_TIMEOUT_MS, cls.GROK_PARSE_TIMEOUT_MS) <= 0:
+            logger.warning(
+                "GROK_CONNECT_TIMEOUT_MS (%d), GROK_READ_TIMEOUT_MS (%d) and "
+                "GROK_PARSE_TIMEOUT_MS (%d) must be positive.",
+                cls.GROK_CONNECT_TIMEOUT_MS,
+                cls.GROK_READ_TIMEOUT_MS,
+                cls.GROK_PARSE_TIMEOUT_MS,
+            )
+            valid = False
+
+        if cls.HAR_MODE not in ("off", "record", "replay"):
+            logger.warning("HAR_MODE %r is not one of off/record/replay.", cls.HAR_MODE)
+            valid = False
+
+        if cls.HAR_NOT_FOUND not in ("abort", "fallback"):
+            logger.warning("HAR_NOT_FOUND %r is not one of abort/fallback.", cls.HAR_NOT_FOUND)
+            valid = False
+
         if not isinstance(cls.LOG_LEVEL, int):
             logger.warning(
                 "LOG_LEVEL resolved to a non-integer (%r). "
@@ -0,0 +1,231 @@
+# agent/element_index.py
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+from urllib.parse import urlparse
+
+from playwright.sync_api import Page
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Compact description of the element an action touched.  Text comes from
+# innerText, placeholder or aria-label — never an input's value, which may
+# be a password the test just typed.
+_FINGERPRINT_JS = """
+(el) => {
+    const rect = el.getBoundingClientRect();
+    const path = [];
+    for (let p = el.parentElement; p && p !== document.body && path.length < 5; p = p.parentElement) {
+        path.push(p.tagName.toLowerCase() + (p.id ? '#' + p.id : ''));
+    }
+    return {
+        tag: el.tagName.toLowerCase(),
+        id: el.id || '',
+        name: el.getAttribute('name') || '',
+        type: el.getAttribute('type') || '',
+        role: el.getAttribute('role') || '',
+        classes: Array.from(el.classList).slice(0, 8),
+        text: (el.innerText || el.getAttribute('placeholder') || el.getAttribute('aria-label') || '')
+            .trim().slice(0, 80),
+        box: {
+            x: Math.round(rect.x + window.scrollX), y: Math.round(rect.y + window.scrollY),
+            w: Math.round(rect.width), h: Math.round(rect.height),
+        },
+        path,
+    };
+}
+"""
+
+# Scores every visible candidate on the page against a stored fingerprint
+# and returns a unique selector for the best one (or null below min_score).
+# Weights: id 30, text 25, name 20, classes 15, tag 10, ancestors 10,
+# position 10, type 5, role 5.
+_MATCH_JS = """
+({ fp, minScore }) => {
+    const lower = s => (s || '').toLowerCase();
+    const words = s => new Set(lower(s).split(/\\s+/).filter(Boolean));
+    const overlap = (a, b) => {
+        if (!a.size || !b.size) return 0;
+        let shared = 0;
+        for (const x of a) if (b.has(x)) shared++;
+        return shared / Math.max(a.size, b.size);
+    };
+    const fpClasses = new Set(fp.classes);
+    const fpPath = new Set(fp.path);
+    const fpText = lower(fp.text);
+    const cx = fp.box.x + fp.box.w / 2, cy = fp.box.y + fp.box.h / 2;
+
+    const candidates = new Set(document.querySelectorAll(
+        `${fp.tag}, a, button, input, select, textarea, [role]`
+    ));
+    let best = null, bestScore = -1;
+    for (const el of candidates) {
+        if (el.getClientRects().length === 0) continue;
+        let score = 0;
+        if (fp.id && el.id === fp.id) score += 30;
+        if (fp.name && el.getAttribute('name') === fp.name) score += 20;
+        if (el.tagName.toLowerCase() === fp.tag) score += 10;
+        if (fp.type && el.getAttribute('type') === fp.type) score += 5;
+        if (fp.role && el.getAttribute('role') === fp.role) score += 5;
+
+        const text = lower((el.innerText || el.getAttribute('placeholder') || el.getAttribute('aria-label') || '')
+            .trim().slice(0, 80));
+        if (fpText && text === fpText) score += 25;
+        else if (fpText && text && (text.includes(fpText) || fpText.includes(text))) score += 15;
+        else score += 10 * overlap(words(text), words(fpText));
+
+        score += 15 * overlap(new Set(el.classList), fpClasses);
+
+        const path = [];
+        for (let p = el.parentElement; p && p !== document.body && path.length < 5; p = p.parentElement) {
+            path.push(p.tagName.toLowerCase() + (p.id ? '#' + p.id : ''));
+        }
+        score += 10 * overlap(new Set(path), fpPath);
+
+        const r = el.getBoundingClientRect();
+        const dx = r.x + window.scrollX + r.width / 2 - cx;
+        const dy = r.y + window.scrollY + r.height / 2 - cy;
+        score += 10 * Math.max(0, 1 - Math.hypot(dx, dy) / 500);
+
+        if (score > bestScore) { best = el; bestScore = score; }
+    }
+    if (!best || bestScore < minScore) return null;
+
+    const unique = sel => { try { return document.querySelectorAll(sel).length === 1; } catch (e) { return false; } };
+    const tag = best.tagName.toLowerCase();
+    let selector = null;
+    if (best.id && unique('#' + CSS.escape(best.id))) {
+        selector = '#' + CSS.escape(best.id);
+    } else if (best.getAttribute('name') && unique(`${tag}[name=${JSON.stringify(best.getAttribute('name'))}]`)) {
+        selector = `${tag}[name=${JSON.stringify(best.getAttribute('name'))}]`;
+    } else {
+        const parts = [];
+        for (let el = best; el && el !== document.body; el = el.parentElement) {
+            const t = el.tagName.toLowerCase();
+            const same = Array.from(el.parentElement.children).filter(c => c.tagName === el.tagName);
+            parts.unshift(same.length > 1 ? `${t}:nth-of-type(${same.indexOf(el) + 1})` : t);
+        }
+        selector = 'body > ' + parts.join(' > ');
+    }
+    return { selector, score: Math.round(bestScore) };
+}
+"""
+
+
+class ElementIndex:
+    """
+    Per-domain index of element fingerprints (tag, id, name, classes,
+    text, ARIA role, bounding box, ancestor path) recorded after each
+    successful action, keyed by the selector the action used.  Capture
+    happens before the action (a click may navigate away); add() only
+    once it succeeded.
+
+    When that selector later breaks, find() scores the live page against
+    the stored fingerprint in a single page.evaluate — a local healing
+    strategy tried before any AI call.  One JSON file per domain under
+    *index_dir*; writes are buffered until save(), which merges them into
+    the file on disk so parallel workers keep each other's entries.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None, max_per_domain: Optional[int] = None):
+        self.index_dir = index_dir or Config.ELEMENT_INDEX_DIR
+        self.max_per_domain = (
+            Config.ELEMENT_INDEX_MAX_PER_DOMAIN if max_per_domain is None else max_per_domain
+        )
+        self._domains: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Selectors added since the last save, per domain.
+        self._dirty: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return (urlparse(url).hostname or "unknown").lower()
+
+    def _path(self, domain: str) -> str:
+        digest = hashlib.md5(domain.encode()).hexdigest()[:12]
+        return os.path.join(self.index_dir, f"{domain[:60]}_{digest}.json")
+
+    def _load(self, domain: str) -> Dict[str, Dict[str, Any]]:
+        path = self._path(domain)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            logger.warning("Element index %s is unreadable — starting empty", path)
+            return {}
+
+    def _entries(self, domain: str) -> Dict[str, Dict[str, Any]]:
+        if domain not in self._domains:
+            self._domains[domain] = self._load(domain)
+        return self._domains[domain]
+
+    def _put(self, entries: Dict[str, Dict[str, Any]], selector: str,
+             fingerprint: Dict[str, Any]) -> None:
+        # Re-insert so dict order stays least- to most-recently recorded.
+        entries.pop(selector, None)
+        entries[selector] = fingerprint
+        while len(entries) > self.max_per_domain:
+            entries.pop(next(iter(entries)))
+
+    def capture(self, page: Page, selector: str) -> Optional[Dict[str, Any]]:
+        """Fingerprint of the first element *selector* matches, or None."""
+        try:
+            return page.locator(selector).first.evaluate(_FINGERPRINT_JS, timeout=1000)
+        except Exception:
+            logger.debug("Could not fingerprint %r", selector, exc_info=True)
+            return None
+
+    def add(self, url: str, selector: str, fingerprint: Dict[str, Any]) -> None:
+        """Store *fingerprint* as the element *selector* targets on *url*'s domain."""
+        fingerprint = dict(fingerprint, recorded=datetime.now().isoformat())
+        domain = self._domain(url)
+        self._put(self._entries(domain), selector, fingerprint)
+        self._dirty.setdefault(domain, set()).add(selector)
+
+    def lookup(self, url: str, selector: str) -> Optional[Dict[str, Any]]:
+        return self._entries(self._domain(url)).get(selector)
+
+    def find(self, page: Page, selector: str) -> Optional[str]:
+        """Best current match for the element *selector* used to hit, or None."""
+        fingerprint = self.lookup(page.url, selector)
+        if fingerprint is None:
+            return None
+        try:
+            match = page.evaluate(
+                _MATCH_JS,
+                {"fp": fingerprint, "minScore": Config.ELEMENT_INDEX_MIN_SCORE},
+            )
+        except Exception:
+            logger.debug("Fingerprint match failed for %r", selector, exc_info=True)
+            return None
+        if not match:
+            return None
+        logger.debug("Fingerprint match for %r: %s (score %d)", selector, match["selector"], match["score"])
+        return match["selector"]
+
+    def save(self) -> None:
+        """Merge the entries recorded since the last save into the files on disk."""
+        for domain, selectors in list(self._dirty.items()):
+            path = self._path(domain)
+            merged = self._load(domain)
+            entries = self._domains[domain]
+            for selector in selectors:
+                if selector in entries:
+                    self._put(merged, selector, entries[selector])
+            try:
+                os.makedirs(self.index_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(merged, f)
+                os.replace(tmp_path, path)
+                self._domains[domain] = merged
+                del self._dirty[domain]
+            except Exception:
+                logger.exception("Element index save error")
@@ -1,14 +1,12 @@
 # agent/enhanced_executor.py
 
-import asyncio
 import logging
 import os
-import sys
 import time
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError, sync_playwright
+from playwright.sync_api import BrowserContext, Page, TimeoutError as PlaywrightTimeoutError
 
 from .advanced_actions import (
     DataExtractor,
@@ -19,12 +17,23 @@ from .advanced_actions import (
     TabManager,
 )
 from .ai_selector import AISelectorHealer
+from .browser_session import BrowserSession
 from .config import Config
+from .element_index import ElementIndex
 from .error_handler import ErrorCategory, ErrorHandler
+from .network_profile import ResourceBlocker
+from .page_fingerprint import page_fingerprint
+from .selector_probe import best_match, race_selectors, split_selector_list
+from .session_cache import SessionCache, find_login_prefix, prefix_key
+from .settle_model import SettleTimeModel
 from .smart_waits import SmartWait
+from .video_retention import retain_video
 
 logger = logging.getLogger(__name__)
 
+# URL fragments that indicate a restored session was bounced to a login page.
+_LOGIN_URL_HINTS = ("login", "signin", "sign-in", "sign_in", "auth")
+
 
 class EnhancedExecutor:
     """
@@ -33,10 +42,19 @@ class EnhancedExecutor:
     """
 
     def __init__(self):
-        self.wait = SmartWait()
+        self.settle_model = (
+            SettleTimeModel() if Config.SETTLE_MODEL_ENABLED else None
+        )
+        self.wait = SmartWait(settle_model=self.settle_model)
         self.healer = AISelectorHealer(use_cache=True)
         self.error_handler = ErrorHandler()
         self.tab_manager = TabManager()
+        self.session_cache = SessionCache()
+        self.element_index = (
+            ElementIndex() if Config.ELEMENT_INDEX_ENABLED else None
+        )
+        # True while a Playwright trace is recording for the current test.
+        self._tracing = False
         self.variables: Dict[str, Any] = {}
 
         Config.validate()
@@ -46,36 +64,119 @@ class EnhancedExecutor:
     # ------------------------------------------------------------------
 
     def execute_actions(
-        self, actions: List[Dict], settings: Optional[Dict] = None
+        self,
+        actions: List[Dict],
+        settings: Optional[Dict] = None,
+        session: Optional[BrowserSession] = None,
+        resume_from: Optional[Dict] = None,
+        checkpoint_depths: Iterable[int] = (),
+        checkpoints: Optional[Dict[str, Dict]] = None,
     ) -> Dict:
-        """Execute a list of actions with enhanced error handling and recovery."""
+        """
+        Execute a list of actions with enhanced error handling and recovery.
+
+        When *session* is given the test runs in a fresh context of that
+        session's shared browser; otherwise a browser is launched for this
+        call only and closed afterwards.
+
+        Prefix sharing (see PrefixSharingRunner): *resume_from* is a
+        checkpoint to continue from instead of running its leading steps,
+        and after each step whose 1-based index is in *checkpoint_depths* a
+        checkpoint is written into *checkpoints*, keyed by the prefix hash.
+        """
         settings = settings or {}
+        fork = (resume_from, set(checkpoint_depths), checkpoints)
 
-        is_headless = settings.get("headless", Config.HEADLESS_MODE)
-        global_timeout = settings.get("timeout", Config.DEFAULT_TIMEOUT)
-        slow_mo = 0 if is_headless else Config.SLOW_MO
+        if session is not None:
+            return self._execute_in_session(session, actions, settings, fork)
 
-        # Must be set before sync_playwright starts on Windows
-        if sys.platform == "win32":
-            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+        with BrowserSession(headless=settings.get("headless")) as own_session:
+            return self._execute_in_session(own_session, actions, settings, fork)
+
+    def _execute_in_session(
+        self,
+        session: BrowserSession,
+        actions: List[Dict],
+        settings: Dict,
+        fork: Tuple[Optional[Dict], Set[int], Optional[Dict[str, Dict]]] = (None, set(), None),
+    ) -> Dict:
+        """Run *actions* in a new, isolated context of *session*."""
+        resume_from, checkpoint_depths, checkpoints = fork
+        self._tracing = False
+        is_headless = session.headless
+        global_timeout = settings.get("timeout", Config.DEFAULT_TIMEOUT)
 
         logs: List[str] = []
         screenshots: List[str] = []
         video_path: Optional[str] = None
         console_logs: List[str] = []
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=is_headless, slow_mo=slow_mo)
-            context = browser.new_context(
-                record_video_dir=(
-                    Config.VIDEO_DIR if Config.VIDEO_RECORDING_ENABLED else None
-                ),
+        # Login prefix that can be skipped by restoring a cached session.
+        prefix_len = 0
+        prefix_cache_key: Optional[str] = None
+        snapshot: Optional[Dict] = None
+        if (
+            resume_from is None
+            and Config.SESSION_CACHE_ENABLED
+            and settings.get("reuse_login", True)
+        ):
+            prefix_len = find_login_prefix(actions)
+            if prefix_len:
+                prefix_cache_key = prefix_key(actions[:prefix_len])
+                snapshot = self.session_cache.get(prefix_cache_key)
+
+        video_mode = settings.get("video_mode", Config.VIDEO_MODE)
+        record_video = Config.should_record_video(settings.get("attempt", 1), video_mode)
+
+        har_mode = settings.get("har_mode", Config.HAR_MODE)
+        har_path: Optional[str] = settings.get("har_path")
+        har_options: Dict[str, Any] = {}
+        replay_har = False
+        if har_mode == "record" and har_path:
+            os.makedirs(os.path.dirname(har_path) or ".", exist_ok=True)
+            # Embedded bodies keep the HAR self-contained for replay.
+            har_options = {"record_har_path": har_path, "record_har_content": "embed"}
+            logs.append(f"[HAR] Recording network traffic to {har_path}")
+        elif har_mode == "replay" and har_path:
+            if os.path.exists(har_path):
+                replay_har = True
+                logs.append(
+                    f"[HAR] Replaying from {har_path} "
+                    f"(unmatched requests: {Config.HAR_NOT_FOUND})"
+                )
+            else:
+                logs.append(f"[HAR] No recording at {har_path} — using live network")
+                har_path = None
+        else:
+            har_path = None
+
+        context: Optional[BrowserContext] = None
+        page: Optional[Page] = None
+        blocker: Optional[ResourceBlocker] = None
+
+        def _open_context(storage_state: Optional[Dict]) -> None:
+            """Create the test's context and page (again after a failed session restore)."""
+            nonlocal context, page, blocker
+            context = session.new_context(
+                **har_options,
+                record_video_dir=Config.VIDEO_DIR if record_video else None,
                 viewport={
                     "width": Config.VIEWPORT_WIDTH,
                     "height": Config.VIEWPORT_HEIGHT,
                 },
+                storage_state=storage_state,
             )
+            blocker = None
+            if settings.get("block_resources", Config.RESOURCE_BLOCKING_ENABLED):
+                blocker = ResourceBlocker()
+                blocker.attach(context)
+            if replay_har:
+                # Registered after the blocker, so the HAR is consulted
+                # first; "fallback" hands unmatched requests to the network.
+                context.route_from_har(har_path, not_found=Config.HAR_NOT_FOUND)
+
             page = context.new_page()
+            self.wait.track_network(page)
 
             if Config.INCLUDE_CONSOLE_LOGS:
                 page.on(
@@ -90,29 +191,92 @@ class EnhancedExecutor:
 
             page.set_default_timeout(global_timeout)
 
+        # Closed by _build_result; the finally below covers every other exit
+        # so a failing step never leaks the context into the shared browser.
+        context_closed = False
+        try:
+            _open_context((resume_from or snapshot or {}).get("storage_state"))
+
             def _build_result(success: bool) -> Dict:
-                # Video file is only complete after context.close()
-                nonlocal video_path
-                context.close()
-                browser.close()
+                # Video file is only complete after context.close().  The
+                # browser itself belongs to the session and stays open.
+                nonlocal video_path, context_closed
+                trace_path = self._stop_trace(page, keep=not success)
+                if self.settle_model:
+                    self.settle_model.save()
+                if self.healer.cache:
+                    self.healer.cache.flush()
+                if self.element_index:
+                    self.element_index.save()
+                try:
+                    context.close()
+                except Exception:
+                    logger.warning("Context close failed (browser may have crashed)")
+                context_closed = True
                 if page.video:
-                    video_path = page.video.path()
+                    try:
+                        video_path = page.video.path()
+                    except Exception:
+                        logger.warning("Could not resolve video path")
+                video_path, video_bytes, video_bytes_discarded = retain_video(
+                    video_path, success, video_mode
+                )
                 result = {
                     "success": success,
                     "logs": logs,
                     "screenshots": screenshots,
                     "video": video_path,
+                    "video_bytes": video_bytes,
+                    "video_bytes_discarded": video_bytes_discarded,
                     "console_logs": (
                         console_logs if Config.INCLUDE_CONSOLE_LOGS else []
                     ),
                     "error_stats": self.error_handler.get_error_statistics(),
+                    "network_stats": blocker.get_stats() if blocker else {},
+                    "har": har_path,
+                    "trace": trace_path,
                 }
                 if success:
                     result["variables"] = self.variables
                     result["healing_stats"] = self.healer.get_healing_stats()
                 return result
 
-            for i, act in enumerate(actions):
+            start_index = 0
+            if resume_from is not None:
+                # Continue a shared prefix that an earlier test already ran.
+                depth = resume_from["depth"]
+                logs.extend(resume_from["logs"])
+                screenshots.extend(resume_from["screenshots"])
+                self.variables.update(resume_from["variables"])
+                try:
+                    page.goto(
+                        resume_from["url"],
+                        timeout=Config.NAVIGATION_TIMEOUT,
+                        wait_until="domcontentloaded",
+                    )
+                    self.wait.wait_dom_ready(page)
+                except Exception as exc:
+                    logs.append(f"[ERROR] Could not resume shared prefix: {exc}")
+                    return _build_result(False)
+                start_index = depth
+                logs.append(f"[FORK] Resumed after shared steps 1-{depth} at {page.url}")
+            elif snapshot:
+                if self._restore_session(page, snapshot, logs):
+                    start_index = prefix_len
+                    logs.append(
+                        f"[SESSION] Restored cached login state — "
+                        f"skipped steps 1-{prefix_len}"
+                    )
+                else:
+                    # Logged out: drop the snapshot and replay the prefix in a
+                    # fresh context so it is re-captured below.  clear_cookies()
+                    # would leave the snapshot's localStorage behind.
+                    self.session_cache.invalidate(prefix_cache_key)
+                    self._discard_context(context, page)
+                    _open_context(None)
+                    logs.append("[SESSION] Cached login expired — replaying login steps")
+
+            for i, act in enumerate(actions[start_index:], start=start_index):
                 action_type = act.get("action", "unknown")
                 logs.append(f"\n[STEP {i + 1}] Executing: {action_type}")
 
@@ -131,6 +295,22 @@ class EnhancedExecutor:
                         page, logs, screenshots, label=f"step_{i + 1}"
                     )
 
+                if checkpoints is not None and i + 1 in checkpoint_depths:
+                    checkpoints[prefix_key(actions[: i + 1])] = {
+                        "depth": i + 1,
+                        "storage_state": context.storage_state(),
+                        "url": page.url,
+                        "variables": dict(self.variables),
+                        "logs": list(logs),
+                        "screenshots": list(screenshots),
+                    }
+
+                if prefix_cache_key and start_index == 0 and i + 1 == prefix_len:
+                    self.session_cache.set(
+                        prefix_cache_key, context.storage_state(), page.url
+                    )
+                    logs.append("[SESSION] Saved login state for later tests")
+
             if Config.SCREENSHOT_ON_SUCCESS:
                 self._capture_screenshot(page, logs, screenshots, label="success")
                 logs.append(
@@ -138,6 +318,12 @@ class EnhancedExecutor:
                 )
 
             return _build_result(True)
+        finally:
+            if context is not None and not context_closed:
+                try:
+                    context.close()
+                except Exception:
+                    logger.warning("Context close failed (browser may have crashed)")
 
     # ------------------------------------------------------------------
     # Retry wrapper
@@ -158,6 +344,7 @@ class EnhancedExecutor:
 
         for attempt in range(1, max_retries + 1):
             try:
+                self.wait.begin_action(page)
                 action_logs = self._perform_action(page, action, timeout)
                 logs.extend(action_logs)
 
@@ -179,6 +366,8 @@ class EnhancedExecutor:
 
                 is_last_attempt = attempt == max_retries
                 if should_retry and not is_last_attempt:
+                    if Config.TRACE_ON_RETRY and not self._tracing:
+                        self._start_trace(page, logs)
                     logs.append(
                         f"[RETRY {attempt}/{max_retries}] "
                         f"{error_details['category']}: {str(exc)[:100]}"
@@ -217,29 +406,38 @@ class EnhancedExecutor:
         # --- CLICK ---
         elif action_type == "click":
             selector = self._replace_variables(action.get("value", ""))
+            requested_selector, page_url = selector, page.url
+            action_hint = f"click {selector}"
 
-            if not self.wait.wait_for_element_clickable(
-                page, selector, timeout=action_timeout
-            ):
-                selector = self._try_heal(
-                    page, selector, f"click {selector}", logs
-                )
+            ready = self._wait_cache_first(
+                page, selector, action_hint, action_timeout, logs, clickable=True
+            )
+            if ready is None:
+                selector = self._try_heal(page, selector, action_hint, logs)
+            else:
+                selector = ready
 
+            element = self._capture_element(page, selector)
             page.click(selector, timeout=action_timeout)
             logs.append(f"[OK] Clicked: {selector}")
+            self._index_element(page_url, requested_selector, element)
 
         # --- TYPE ---
         elif action_type == "type":
             selector = self._replace_variables(action.get("field", "input"))
             value = self._replace_variables(action.get("value", ""))
+            requested_selector, page_url = selector, page.url
+            action_hint = f"type '{value}' into {selector}"
 
-            if not self.wait.wait_for_element(
-                page, selector, timeout=action_timeout
-            ):
-                selector = self._try_heal(
-                    page, selector, f"type '{value}' into {selector}", logs
-                )
+            ready = self._wait_cache_first(
+                page, selector, action_hint, action_timeout, logs
+            )
+            if ready is None:
+                selector = self._try_heal(page, selector, action_hint, logs)
+            else:
+                selector = ready
 
+            element = self._capture_element(page, selector)
             try:
                 page.fill(selector, value, timeout=action_timeout)
                 logs.append(f"[OK] Typed '{value}' into {selector}")
@@ -247,6 +445,7 @@ class EnhancedExecutor:
                 page.click(selector)
                 page.keyboard.type(value)
                 logs.append(f"[FALLBACK] Typed '{value}' using keyboard")
+            self._index_element(page_url, requested_selector, element)
 
         # --- HOVER ---
         elif action_type == "hover":
@@ -334,7 +533,11 @@ class EnhancedExecutor:
             expected = self._replace_variables(action.get("value", ""))
             logs.append(f"[CHECK] Verifying text: '{expected}'...")
             if self.wait.wait_for_text(page, expected, timeout=action_timeout):
-                logs.append(f"[ASSERT OK] Found text: '{expected}'")
+                location = self.wait.find_text_element(page, expected)
+                logs.append(
+                    f"[ASSERT OK] Found text: '{expected}'"
+                    + (f" in {location}" if location else "")
+                )
             else:
                 raise AssertionError(
                     f"Expected text not found: '{expected}' after {action_timeout}ms"
@@ -364,14 +567,86 @@ class EnhancedExecutor:
     # Helpers
     # ------------------------------------------------------------------
 
+    def _wait_cache_first(
+        self,
+        page: Page,
+        selector: str,
+        action_hint: str,
+        timeout: int,
+        logs: List[str],
+        clickable: bool = False,
+    ) -> Optional[str]:
+        """
+        Wait for *selector*, racing it against its cached healed selector
+        when there is one.  Returns whichever appeared first (the original
+        if both did), or None if neither did so the caller can heal.
+        """
+        cache = self.healer.cache
+        fingerprint = self._page_fingerprint(page) if cache else None
+        cached = cache.get(page.url, selector, action_hint, fingerprint) if cache else None
+        if not cached or cached == selector:
+            wait = (
+                self.wait.wait_for_element_clickable
+                if clickable
+                else self.wait.wait_for_element
+            )
+            return selector if wait(page, selector, timeout=timeout) else None
+
+        winner = race_selectors(page, selector, cached, timeout)
+        cache.record_race(
+            page.url, selector, action_hint, cached_won=winner == cached,
+            fingerprint=fingerprint,
+        )
+        if winner == cached:
+            logs.append(f"[CACHE] {selector} → {cached}")
+        return winner
+
+    def _capture_element(self, page: Page, selector: str) -> Optional[Dict]:
+        """Fingerprint the action's target before acting (index enabled only)."""
+        return self.element_index.capture(page, selector) if self.element_index else None
+
+    def _index_element(self, page_url: str, selector: str, element: Optional[Dict]) -> None:
+        """Record a captured fingerprint once its action has succeeded."""
+        if self.element_index and element:
+            self.element_index.add(page_url, selector, element)
+
+    @staticmethod
+    def _page_fingerprint(page: Page) -> Optional[Dict[str, str]]:
+        """Structural cache-key fingerprint, if SELECTOR_CACHE_FINGERPRINT_KEYS is on."""
+        return page_fingerprint(page) if Config.SELECTOR_CACHE_FINGERPRINT_KEYS else None
+
     def _try_heal(
         self, page: Page, selector: str, action_hint: str, logs: List[str]
     ) -> str:
         """
-        Attempt AI healing for a selector.  Returns the healed selector if
-        healing succeeded, or the original selector if it did not, so the
-        caller always gets a usable string.
+        Attempt to heal a selector: first by probing the parts of a
+        comma-separated selector for a visible match, then against the
+        element index fingerprint, then with AI.  Returns
+        the healed selector if healing succeeded, or the original selector
+        if it did not, so the caller always gets a usable string.
         """
+        fingerprint = self._page_fingerprint(page)
+        parts = split_selector_list(selector)
+        if len(parts) > 1:
+            visible_part = best_match(page, parts)
+            if visible_part:
+                logs.append(f"[PROBE] {selector} → {visible_part}")
+                self.healer.remember(
+                    page.url, selector, action_hint, visible_part, "HEURISTIC",
+                    fingerprint=fingerprint,
+                )
+                return visible_part
+
+        if self.element_index:
+            matched = self.element_index.find(page, selector)
+            if matched and matched != selector:
+                logs.append(f"[FINGERPRINT HEAL] {selector} → {matched}")
+                self.healer.remember(
+                    page.url, selector, action_hint, matched, "FINGERPRINT",
+                    fingerprint=fingerprint,
+                )
+                return matched
+
         if not Config.AI_HEALING_ENABLED:
             return selector
 
@@ -382,6 +657,8 @@ class EnhancedExecutor:
             action_hint,
             page_url=page.url,
             page_title=page.title(),
+            validate=lambda candidate: best_match(page, [candidate]) is not None,
+            fingerprint=fingerprint,
         )
         if healed:
             logs.append(f"[AI HEAL] {selector} → {healed}")
@@ -390,6 +667,72 @@ class EnhancedExecutor:
         logs.append("[AI HEAL] Healing failed — retrying with original selector")
         return selector
 
+    def _start_trace(self, page: Page, logs: List[str]) -> None:
+        """Begin recording a trace; called when an action first retries."""
+        try:
+            page.context.tracing.start(screenshots=True, snapshots=True, sources=False)
+            self._tracing = True
+            logs.append("[TRACE] Action is retrying — trace recording started")
+        except Exception:
+            logger.exception("Failed to start tracing")
+
+    def _stop_trace(self, page: Page, keep: bool) -> Optional[str]:
+        """
+        Stop an active trace.  Saves and returns the zip path when *keep*
+        (the test failed); otherwise the trace is discarded.
+        """
+        if not self._tracing:
+            return None
+        self._tracing = False
+        try:
+            if not keep:
+                page.context.tracing.stop()
+                return None
+            path = os.path.join(Config.TRACE_DIR, f"trace_{uuid.uuid4()}.zip")
+            os.makedirs(Config.TRACE_DIR, exist_ok=True)
+            page.context.tracing.stop(path=path)
+            return path
+        except Exception:
+            logger.exception("Failed to stop tracing")
+            return None
+
+    def _restore_session(self, page: Page, snapshot: Dict, logs: List[str]) -> bool:
+        """
+        Open the URL a cached login prefix ended on and check that the
+        restored session is still logged in.  A visible password field, or
+        a redirect to a login-looking URL, means it is not.
+        """
+        url = snapshot.get("url") or ""
+        if not url or url == "about:blank":
+            return False
+        try:
+            page.goto(
+                url, timeout=Config.NAVIGATION_TIMEOUT, wait_until="domcontentloaded"
+            )
+            self.wait.wait_dom_ready(page)
+            if page.locator("input[type='password']").first.is_visible():
+                return False
+            landed = page.url.lower()
+            if any(k in landed for k in _LOGIN_URL_HINTS) and not any(
+                k in url.lower() for k in _LOGIN_URL_HINTS
+            ):
+                return False
+            logs.append(f"[OK] Navigated to {page.url}")
+            return True
+        except Exception as exc:
+            logger.warning("Session restore failed: %s", exc)
+            return False
+
+    @staticmethod
+    def _discard_context(context: BrowserContext, page: Page) -> None:
+        """Close a context that will not be reported, deleting its video."""
+        try:
+            context.close()
+            if page.video:
+                os.remove(page.video.path())
+        except Exception:
+            logger.warning("Could not discard context of failed session restore")
+
     def _capture_screenshot(
         self,
         page: Page,
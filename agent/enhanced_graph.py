@@ -6,8 +6,12 @@ from typing import Any, Dict, List, Optional
 from langgraph.graph import END, StateGraph
 from pydantic import BaseModel, Field
 
+from .browser_session import BrowserSession
+from .config import Config
 from .enhanced_executor import EnhancedExecutor
 from .enhanced_parser import EnhancedInstructionParser
+from .network_profile import har_settings_for
+from .prefix_trie import PrefixSharingRunner
 from .reporter import Reporter
 
 logger = logging.getLogger(__name__)
@@ -21,10 +25,15 @@ _EMPTY_EXEC_RESULT: Dict[str, Any] = {
     "logs": [],
     "screenshots": [],
     "video": None,
+    "video_bytes": 0,
+    "video_bytes_discarded": 0,
     "console_logs": [],
     "variables": {},
     "healing_stats": None,
     "error_stats": {},
+    "network_stats": {},
+    "har": None,
+    "trace": None,
 }
 
 
@@ -72,7 +81,8 @@ def build_enhanced_batch_graph():
     The compiled graph is safe for sequential invocations.  It is NOT safe
     for concurrent invocations because EnhancedInstructionParser and Reporter
     are instantiated fresh inside each node call — but EnhancedExecutor
-    is also fresh per test, so no cross-test state leaks.
+    is also fresh per test, so no cross-test state leaks.  execute_all
+    launches one browser per batch and runs each test in its own context.
 
     Returns:
         A compiled LangGraph graph ready for `.invoke()`.
@@ -121,33 +131,61 @@ def build_enhanced_batch_graph():
     def execute_all_node(state: EnhancedBatchState) -> Dict[str, Any]:
         """Execute all parsed action sets."""
         exec_results: List[Any] = []
-
-        for i, (actions, parse_error) in enumerate(
-            zip(state.parsed_sets, state.parse_errors)
-        ):
-            logger.info(
-                "[EXECUTING TEST %d/%d]", i + 1, len(state.parsed_sets)
+        settings = state.settings or {}
+
+        # One browser for the whole batch; every test gets its own context.
+        with BrowserSession(
+            headless=settings.get("headless"),
+            cdp_endpoint=settings.get("cdp_endpoint"),
+        ) as session:
+            runner = (
+                PrefixSharingRunner(state.parsed_sets, state.settings, session)
+                if Config.PREFIX_SHARING_ENABLED
+                else None
             )
-
-            # If parsing failed, emit a structured failure immediately.
-            if actions is None:
-                result = _failed_exec_result(
-                    RuntimeError(f"Skipped — parse error: {parse_error}")
+            for i, (actions, parse_error) in enumerate(
+                zip(state.parsed_sets, state.parse_errors)
+            ):
+                logger.info(
+                    "[EXECUTING TEST %d/%d]", i + 1, len(state.parsed_sets)
                 )
-                exec_results.append(result)
-                continue
 
-            # Fresh executor per test — no shared mutable state between tests.
-            executor = EnhancedExecutor()
-            try:
-                result = executor.execute_actions(
-                    actions, settings=state.settings
-                )
-            except Exception as exc:
-                logger.exception("Test %d: unexpected execution error", i + 1)
-                result = _failed_exec_result(exc)
+                # If parsing failed, emit a structured failure immediately.
+                if actions is None:
+                    result = _failed_exec_result(
+                        RuntimeError(f"Skipped — parse error: {parse_error}")
+                    )
+                    exec_results.append(result)
+                    continue
+
+                # Same id generate_reports_node uses, so per-test artifacts
+                # (e.g. the HAR file) land next to the report.
+                test_settings = har_settings_for(state.settings, f"ID-{i + 1:03d}")
+
+                # attempt > 1 only after a failure (see Config.TEST_RETRIES);
+                # the executor uses it for VIDEO_MODE=on-first-retry.
+                for attempt in range(1, Config.TEST_RETRIES + 2):
+                    test_settings["attempt"] = attempt
+
+                    # Fresh executor per attempt — no shared mutable state between tests.
+                    executor = EnhancedExecutor()
+                    try:
+                        if runner is not None:
+                            result = runner.run(i, executor, settings=test_settings)
+                        else:
+                            result = executor.execute_actions(
+                                actions, settings=test_settings, session=session
+                            )
+                    except Exception as exc:
+                        logger.exception("Test %d: unexpected execution error", i + 1)
+                        result = _failed_exec_result(exc)
+
+                    result["attempts"] = attempt
+                    if result.get("success") or attempt > Config.TEST_RETRIES:
+                        break
+                    logger.info("Test %d failed — retry %d/%d", i + 1, attempt, Config.TEST_RETRIES)
 
-            exec_results.append(result)
+                exec_results.append(result)
 
         return {"exec_results": exec_results}
 
@@ -6,9 +6,11 @@ import os
 import re
 from typing import Any, Dict, List, Optional
 
-import requests
 from dotenv import load_dotenv
 
+from .config import Config
+from .grok_client import get_grok_client
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -23,7 +25,7 @@ class EnhancedInstructionParser:
     def __init__(self):
         self.variables: Dict[str, Any] = {}
         self.grok_api_key = os.getenv("GROK_API_KEY")
-        self.grok_url = "https://api.x.ai/v1/chat/completions"
+        self.client = get_grok_client()
 
     # ------------------------------------------------------------------
     # Public API
@@ -107,31 +109,21 @@ Output: [{{"action": "goto", "value": "https://google.com"}}, {{"action": "type"
 
 Now parse this instruction:"""
 
-        response = requests.post(
-            self.grok_url,
-            headers={
-                "Authorization": f"Bearer {self.grok_api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "grok-beta",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a JSON-only instruction parser. "
-                            "Return only valid JSON arrays, no markdown."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                "temperature": 0.1,
-            },
-            timeout=10,
+        content = self.client.chat(
+            [
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a JSON-only instruction parser. "
+                        "Return only valid JSON arrays, no markdown."
+                    ),
+                },
+                {"role": "user", "content": prompt},
+            ],
+            self.grok_api_key,
+            read_timeout_ms=Config.GROK_PARSE_TIMEOUT_MS,
+            purpose="parse",
         )
-        response.raise_for_status()
-
-        content = response.json()["choices"][0]["message"]["content"].strip()
         content = self._strip_markdown_fences(content)
 
         actions = json.loads(content)
@@ -12,7 +12,10 @@ from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError, sy
 
 from .ai_selector import AISelectorHealer
 from .config import Config
+from .page_fingerprint import page_fingerprint
+from .selector_probe import best_match, race_selectors, split_selector_list
 from .smart_waits import SmartWait
+from .video_retention import retain_video
 
 logger = logging.getLogger(__name__)
 
@@ -43,35 +46,46 @@ class Executor:
           1. Heuristic alternatives (quote style, tag swaps, common inputs)
           2. AI-powered DOM analysis (Grok)
 
+        Heuristic replacements derived from *selector* are cached like AI
+        ones, so the next run finds them in _wait_cache_first() without
+        healing again; the generic input/textarea fallbacks are not.
+
         Returns:
             (selector, mode) where mode is "HEURISTIC", "AI", or "NONE".
         """
+        fingerprint = self._page_fingerprint(page)
+
         # --- Strategy 1: heuristic alternatives ---
-        alternatives = [
-            selector,
+        # Parts of a comma-separated selector (as produced by the parser) are
+        # tried individually so a visible later part beats a hidden first one.
+        derived = split_selector_list(selector) + [
             selector.replace("input", "textarea"),
             selector.replace("textarea", "input"),
             selector.replace("'", '"'),
             selector.replace('"', "'"),
-            "input[type='text']",
-            "textarea",
-            "input",
         ]
-
-        for alt in alternatives:
-            try:
-                page.wait_for_selector(alt, timeout=2000)
-                if alt != selector:
-                    logger.debug("Heuristic healed %r → %r", selector, alt)
-                return alt, "HEURISTIC"
-            except Exception:
-                pass
+        # Last resorts that ignore the failed selector.  Never cached: a
+        # cached bare "input" would win the cache-first race against the
+        # real target on every later run.
+        generic = ["input[type='text']", "textarea", "input"]
+
+        # All candidates are probed in a single page.evaluate round trip.
+        alt = best_match(page, dict.fromkeys(derived + generic))
+        if alt:
+            if alt != selector and alt in derived:
+                logger.debug("Heuristic healed %r → %r", selector, alt)
+                self._healer.remember(
+                    page.url, selector, action_hint, alt, "HEURISTIC", fingerprint=fingerprint
+                )
+            return alt, "HEURISTIC"
 
         # --- Strategy 2: AI healing ---
         try:
             healed = self._healer.heal(
                 page.content(), selector, action_hint,
-                page_url=page.url, page_title=page.title()
+                page_url=page.url, page_title=page.title(),
+                validate=lambda candidate: best_match(page, [candidate]) is not None,
+                fingerprint=fingerprint,
             )
             if healed:
                 logger.debug("AI healed %r → %r", selector, healed)
@@ -81,6 +95,34 @@ class Executor:
 
         return selector, "NONE"
 
+    @staticmethod
+    def _page_fingerprint(page: Page) -> Optional[Dict[str, str]]:
+        """Structural cache-key fingerprint, if SELECTOR_CACHE_FINGERPRINT_KEYS is on."""
+        return page_fingerprint(page) if Config.SELECTOR_CACHE_FINGERPRINT_KEYS else None
+
+    def _wait_cache_first(
+        self, page: Page, selector: str, action_hint: str, timeout: int, logs: List[str]
+    ) -> Optional[str]:
+        """
+        Wait for *selector*, racing it against its cached healed selector
+        when there is one.  Returns whichever appeared first (the original
+        if both did), or None if neither did.
+        """
+        cache = self._healer.cache
+        fingerprint = self._page_fingerprint(page) if cache else None
+        cached = cache.get(page.url, selector, action_hint, fingerprint) if cache else None
+        if not cached or cached == selector:
+            return selector if self.wait.wait_for_element(page, selector, timeout=timeout) else None
+
+        winner = race_selectors(page, selector, cached, timeout)
+        cache.record_race(
+            page.url, selector, action_hint, cached_won=winner == cached,
+            fingerprint=fingerprint,
+        )
+        if winner == cached:
+            logs.append(f"[CACHE HEAL] {selector} → {cached}")
+        return winner
+
     # ------------------------------------------------------------------
     # Main execution loop
     # ------------------------------------------------------------------
@@ -102,19 +144,20 @@ class Executor:
         logs: List[str] = []
         screenshots: List[str] = []
         video_path: Optional[str] = None
+        video_mode = settings.get("video_mode", Config.VIDEO_MODE)
+        record_video = Config.should_record_video(settings.get("attempt", 1), video_mode)
 
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=is_headless, slow_mo=slow_mo)
             context = browser.new_context(
-                record_video_dir=(
-                    Config.VIDEO_DIR if Config.VIDEO_RECORDING_ENABLED else None
-                ),
+                record_video_dir=Config.VIDEO_DIR if record_video else None,
                 viewport={
                     "width": Config.VIEWPORT_WIDTH,
                     "height": Config.VIEWPORT_HEIGHT,
                 },
             )
             page = context.new_page()
+            self.wait.track_network(page)
 
             if not is_headless:
                 page.bring_to_front()
@@ -133,11 +176,20 @@ class Executor:
                 return video_path
 
             def _build_result(success: bool) -> Dict:
+                video, video_bytes, video_bytes_discarded = retain_video(
+                    _close_and_collect_video(), success, video_mode
+                )
+                # Write-behind cache: persist this run's heals and hit counts
+                # now, since pool workers exit without running atexit handlers.
+                if self._healer.cache:
+                    self._healer.cache.flush()
                 return {
                     "success": success,
                     "logs": logs,
                     "screenshots": screenshots,
-                    "video": _close_and_collect_video(),
+                    "video": video,
+                    "video_bytes": video_bytes,
+                    "video_bytes_discarded": video_bytes_discarded,
                 }
 
             for act in actions:
@@ -185,11 +237,15 @@ class Executor:
         # --- CLICK ---
         elif action_type == "click":
             selector = act["value"]
-            if not self.wait.wait_for_element(page, selector, timeout=timeout):
+            action_hint = f"click {selector}"
+            ready = self._wait_cache_first(page, selector, action_hint, timeout, logs)
+            if ready is None:
                 selector, mode = self.heal_selector(
-                    page, selector, action_hint=f"click {selector}"
+                    page, selector, action_hint=action_hint
                 )
                 logs.append(f"[{mode} HEAL] Click selector → {selector}")
+            else:
+                selector = ready
             page.click(selector, timeout=timeout)
             logs.append(f"[OK] Clicked {selector}")
 
@@ -197,12 +253,15 @@ class Executor:
         elif action_type == "type":
             selector = act["field"]
             value = act["value"]
-            if not self.wait.wait_for_element(page, selector, timeout=timeout):
+            action_hint = f"type '{value}' into {selector}"
+            ready = self._wait_cache_first(page, selector, action_hint, timeout, logs)
+            if ready is None:
                 selector, mode = self.heal_selector(
-                    page, selector,
-                    action_hint=f"type '{value}' into {selector}"
+                    page, selector, action_hint=action_hint
                 )
                 logs.append(f"[{mode} HEAL] Type selector → {selector}")
+            else:
+                selector = ready
             try:
                 page.fill(selector, value, timeout=timeout)
                 logs.append(f"[OK] Typed '{value}'")
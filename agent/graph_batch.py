@@ -6,6 +6,10 @@ from typing import Any, Dict, List, Optional
 from langgraph.graph import END, StateGraph
 from pydantic import BaseModel, Field
 
+from .browser_session import BrowserSession
+from .config import Config
+from .network_profile import har_settings_for
+from .prefix_trie import PrefixSharingRunner
 from .reporter import Reporter
 
 # ---------------------------------------------------------------------------
@@ -21,8 +25,10 @@ except ImportError:
 
 try:
     from .enhanced_executor import EnhancedExecutor as Executor
+    _EXECUTOR_SUPPORTS_SESSION = True
 except ImportError:
     from .executor import Executor                 # type: ignore[assignment]
+    _EXECUTOR_SUPPORTS_SESSION = False
 
 logger = logging.getLogger(__name__)
 
@@ -35,10 +41,15 @@ _EMPTY_EXEC_RESULT: Dict[str, Any] = {
     "logs": [],
     "screenshots": [],
     "video": None,
+    "video_bytes": 0,
+    "video_bytes_discarded": 0,
     "console_logs": [],
     "variables": {},
     "healing_stats": None,
     "error_stats": {},
+    "network_stats": {},
+    "har": None,
+    "trace": None,
 }
 
 
@@ -130,28 +141,59 @@ def build_batch_graph():
     # ------------------------------------------------------------------
     def execute_all_node(state: BatchState) -> Dict[str, Any]:
         exec_results: List[Any] = []
-
-        for i, (actions, parse_error) in enumerate(
-            zip(state.parsed_sets, state.parse_errors)
-        ):
-            logger.info("[EXECUTING TEST %d/%d]", i + 1, len(state.parsed_sets))
-
-            if actions is None:
-                exec_results.append(
-                    _failed_exec_result(
-                        RuntimeError(f"Skipped — parse error: {parse_error}")
+        settings = state.settings or {}
+
+        # One browser for the whole batch; every test gets its own context.
+        with BrowserSession(
+            headless=settings.get("headless"),
+            cdp_endpoint=settings.get("cdp_endpoint"),
+        ) as session:
+            runner = (
+                PrefixSharingRunner(state.parsed_sets, state.settings, session)
+                if Config.PREFIX_SHARING_ENABLED and _EXECUTOR_SUPPORTS_SESSION
+                else None
+            )
+            for i, (actions, parse_error) in enumerate(
+                zip(state.parsed_sets, state.parse_errors)
+            ):
+                logger.info("[EXECUTING TEST %d/%d]", i + 1, len(state.parsed_sets))
+
+                if actions is None:
+                    exec_results.append(
+                        _failed_exec_result(
+                            RuntimeError(f"Skipped — parse error: {parse_error}")
+                        )
                     )
-                )
-                continue
-
-            executor = Executor()
-            try:
-                result = executor.execute_actions(actions, settings=state.settings)
-            except Exception as exc:
-                logger.exception("Test %d: unexpected execution error", i + 1)
-                result = _failed_exec_result(exc)
-
-            exec_results.append(result)
+                    continue
+
+                # Same id generate_reports_node uses, so per-test artifacts
+                # (e.g. the HAR file) land next to the report.
+                test_settings = har_settings_for(state.settings, f"ID-{i + 1:03d}")
+                # attempt > 1 only after a failure (see Config.TEST_RETRIES);
+                # the executor uses it for VIDEO_MODE=on-first-retry.
+                for attempt in range(1, Config.TEST_RETRIES + 2):
+                    test_settings["attempt"] = attempt
+
+                    executor = Executor()
+                    try:
+                        if runner is not None:
+                            result = runner.run(i, executor, settings=test_settings)
+                        elif _EXECUTOR_SUPPORTS_SESSION:
+                            result = executor.execute_actions(
+                                actions, settings=test_settings, session=session
+                            )
+                        else:
+                            result = executor.execute_actions(actions, settings=test_settings)
+                    except Exception as exc:
+                        logger.exception("Test %d: unexpected execution error", i + 1)
+                        result = _failed_exec_result(exc)
+
+                    result["attempts"] = attempt
+                    if result.get("success") or attempt > Config.TEST_RETRIES:
+                        break
+                    logger.info("Test %d failed — retry %d/%d", i + 1, attempt, Config.TEST_RETRIES)
+
+                exec_results.append(result)
 
         return {"exec_results": exec_results}
 
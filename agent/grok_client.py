@@ -0,0 +1,227 @@
+# agent/grok_client.py
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Transient statuses worth retrying: rate limiting and server-side errors.
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class GrokClient:
+    """
+    Shared HTTP client for Grok chat-completion calls.
+
+    One requests.Session with a pooled, keep-alive HTTPAdapter, so repeated
+    heals and parses reuse connections instead of paying a TCP + TLS
+    handshake each.  429/5xx responses and connection errors are retried
+    with exponential backoff (honouring Retry-After); POST is retried too,
+    since a chat completion has no side effects.  Read timeouts are not:
+    the server may already be working on the request, and retrying would
+    multiply the worst-case wait by the retry count.
+
+    Every call records its latency, status, retry count and token usage;
+    get_stats() aggregates them.  GROK_API_URL points the client at a local
+    stand-in server for tests.
+    """
+
+    # Per-call metrics kept for get_stats()["recent"].
+    HISTORY_SIZE = 100
+
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        model: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_ms: Optional[int] = None,
+        connect_timeout_ms: Optional[int] = None,
+        read_timeout_ms: Optional[int] = None,
+    ):
+        self.api_url = api_url or Config.GROK_API_URL
+        self.model = model or Config.GROK_MODEL
+        self.pool_size = Config.GROK_POOL_SIZE if pool_size is None else pool_size
+        self.max_retries = Config.GROK_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_ms = Config.GROK_RETRY_BACKOFF_MS if backoff_ms is None else backoff_ms
+        self.connect_timeout_ms = (
+            Config.GROK_CONNECT_TIMEOUT_MS if connect_timeout_ms is None else connect_timeout_ms
+        )
+        self.read_timeout_ms = (
+            Config.GROK_READ_TIMEOUT_MS if read_timeout_ms is None else read_timeout_ms
+        )
+
+        self.session = self._build_session()
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.history: deque = deque(maxlen=self.HISTORY_SIZE)
+
+    def _build_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_ms / 1000,
+            # False re-raises the read timeout as-is (requests' ReadTimeout).
+            read=False,
+            status_forcelist=_RETRY_STATUSES,
+            allowed_methods=frozenset({"POST"}),
+            respect_retry_after_header=True,
+            # Hand the last 429/5xx back so raise_for_status() reports it.
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        api_key: str,
+        temperature: float = 0.1,
+        read_timeout_ms: Optional[int] = None,
+        purpose: str = "chat",
+    ) -> str:
+        """
+        Send *messages* and return the first choice's content, stripped.
+
+        Raises requests.exceptions.Timeout / HTTPError / ConnectionError once
+        retries are exhausted; *purpose* labels the call in the metrics.
+        """
+        read_timeout_ms = self.read_timeout_ms if read_timeout_ms is None else read_timeout_ms
+        start = time.perf_counter()
+        response: Optional[requests.Response] = None
+        try:
+            response = self.session.post(
+                self.api_url,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                },
+                json={
+                    "model": self.model,
+                    "messages": messages,
+                    "temperature": temperature,
+                },
+                timeout=(self.connect_timeout_ms / 1000, read_timeout_ms / 1000),
+            )
+            response.raise_for_status()
+            body = response.json()
+            content = body["choices"][0]["message"]["content"].strip()
+        except Exception:
+            self._record(purpose, start, response, None, success=False)
+            raise
+
+        self._record(purpose, start, response, body.get("usage"), success=True)
+        return content
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Aggregate call metrics plus the most recent per-call records."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "retries": self.retries,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "avg_latency_ms": (
+                    round(self.total_latency_ms / self.calls, 1) if self.calls else 0.0
+                ),
+                "max_latency_ms": round(self.max_latency_ms, 1),
+                "pool_size": self.pool_size,
+                "api_url": self.api_url,
+                "recent": list(self.history),
+            }
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def _record(
+        self,
+        purpose: str,
+        start: float,
+        response: Optional[requests.Response],
+        usage: Optional[Dict[str, Any]],
+        success: bool,
+    ) -> None:
+        latency_ms = (time.perf_counter() - start) * 1000
+        retries = 0
+        if response is not None:
+            # urllib3 attaches the Retry state, whose history lists each retry.
+            retry_state = getattr(response.raw, "retries", None)
+            retries = len(retry_state.history) if retry_state is not None else 0
+        usage = usage or {}
+        call = {
+            "purpose": purpose,
+            "status": response.status_code if response is not None else None,
+            "success": success,
+            "latency_ms": round(latency_ms, 1),
+            "retries": retries,
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+        }
+        with self._lock:
+            self.calls += 1
+            self.failures += 0 if success else 1
+            self.retries += retries
+            self.prompt_tokens += call["prompt_tokens"]
+            self.completion_tokens += call["completion_tokens"]
+            self.total_latency_ms += latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            self.history.append(call)
+        logger.debug("Grok %s call: %s", purpose, call)
+
+
+_client: Optional[GrokClient] = None
+_client_lock = threading.Lock()
+
+
+def get_grok_client() -> GrokClient:
+    """Process-wide shared client, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GrokClient()
+        return _client
+
+
+def _reset_after_fork() -> None:
+    """Forked workers (ParallelExecutor) must not share the parent's sockets."""
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,127 @@
+# agent/network_profile.py
+
+import logging
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext as AsyncBrowserContext, Route as AsyncRoute
+from playwright.sync_api import BrowserContext, Route
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Rough median transfer sizes per resource type, used only to estimate the
+# bytes a blocked request would have cost.  Aborted requests never report
+# their real size.
+_TYPICAL_BYTES: Dict[str, int] = {
+    "image":      25_000,
+    "font":       30_000,
+    "media":     500_000,
+    "stylesheet": 15_000,
+    "script":     20_000,
+}
+_DEFAULT_BYTES = 5_000
+
+
+class ResourceBlocker:
+    """
+    page.route() profile that aborts requests irrelevant to text and
+    selector assertions — images, fonts, media, third-party analytics —
+    and counts what it blocked.
+
+    Attach one blocker per test context (attach_async() for
+    playwright.async_api contexts); its get_stats() goes into the exec
+    result as "network_stats".
+    """
+
+    def __init__(
+        self,
+        resource_types: Optional[Iterable[str]] = None,
+        domains: Optional[Iterable[str]] = None,
+    ):
+        self.resource_types = set(
+            Config.BLOCK_RESOURCE_TYPES if resource_types is None else resource_types
+        )
+        self.domains = tuple(
+            d.lstrip(".") for d in (Config.BLOCK_DOMAINS if domains is None else domains)
+        )
+        self.blocked_requests = 0
+        self.estimated_bytes_saved = 0
+        self.blocked_by_type: Dict[str, int] = {}
+
+    def attach(self, context: BrowserContext) -> None:
+        context.route("**/*", self._handle)
+
+    async def attach_async(self, context: AsyncBrowserContext) -> None:
+        await context.route("**/*", self._handle_async)
+
+    def _is_blocked_domain(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == d or host.endswith("." + d) for d in self.domains)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        return resource_type in self.resource_types or self._is_blocked_domain(url)
+
+    def _handle(self, route: Route) -> None:
+        request = route.request
+        try:
+            if self.should_block(request.url, request.resource_type):
+                route.abort("blockedbyclient")
+                self._count_blocked(request.resource_type)
+            else:
+                route.continue_()
+        except Exception:
+            # The page may have navigated away or closed mid-request.
+            logger.debug("Route handling failed for %s", request.url, exc_info=True)
+
+    async def _handle_async(self, route: AsyncRoute) -> None:
+        request = route.request
+        try:
+            if self.should_block(request.url, request.resource_type):
+                await route.abort("blockedbyclient")
+                self._count_blocked(request.resource_type)
+            else:
+                await route.continue_()
+        except Exception:
+            logger.debug("Route handling failed for %s", request.url, exc_info=True)
+
+    def _count_blocked(self, resource_type: str) -> None:
+        self.blocked_requests += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        self.estimated_bytes_saved += _TYPICAL_BYTES.get(resource_type, _DEFAULT_BYTES)
+
+    def get_stats(self) -> Dict:
+        return {
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "estimated_bytes_saved": self.estimated_bytes_saved,
+        }
+
+
+# ---------------------------------------------------------------------------
+# HAR record / replay
+# ---------------------------------------------------------------------------
+
+def har_path_for(test_id: str) -> str:
+    """HAR file for *test_id*, stored next to its tests/report_<id>.* files."""
+    return f"tests/report_{test_id}.har"
+
+
+def har_settings_for(settings: Optional[Dict[str, Any]], test_id: str) -> Dict[str, Any]:
+    """
+    Per-test copy of batch *settings* with the HAR options resolved.
+
+    settings["har_mode"] overrides Config.HAR_MODE for the batch, and
+    settings["har_tests"] (a list of test ids) limits record/replay to
+    those tests — every other test runs against the live network.
+    """
+    test_settings = dict(settings or {})
+    har_mode = test_settings.get("har_mode", Config.HAR_MODE)
+    har_tests = test_settings.get("har_tests")
+    if har_tests is not None and test_id not in har_tests:
+        har_mode = "off"
+    test_settings["har_mode"] = har_mode
+    if har_mode != "off":
+        test_settings.setdefault("har_path", har_path_for(test_id))
+    return test_settings
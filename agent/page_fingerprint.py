@@ -0,0 +1,62 @@
+# agent/page_fingerprint.py
+
+import logging
+import re
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from playwright.sync_api import Page
+
+logger = logging.getLogger(__name__)
+
+# Path segments that identify a record rather than a page: numbers, UUIDs,
+# long hex hashes and long opaque tokens.
+_ID_SEGMENT_RE = re.compile(
+    r"^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+    r"|[0-9a-f]{16,}|[A-Za-z0-9_-]{24,})$",
+    re.IGNORECASE,
+)
+
+# Hash of the page's interactive skeleton — tag, type, id, name and role of
+# every form control, link and button, in document order.  Text is left out
+# so the hash survives copy changes and i18n; FNV-1a keeps it in-page.
+_SKELETON_JS = """
+() => {
+    const nodes = document.querySelectorAll(
+        'a[href], button, input, select, textarea, [role], [contenteditable="true"]'
+    );
+    let hash = 0x811c9dc5;
+    for (const el of nodes) {
+        const sig = [el.tagName, el.getAttribute('type') || '', el.id || '',
+                     el.getAttribute('name') || '', el.getAttribute('role') || ''].join('|');
+        for (let i = 0; i < sig.length; i++) {
+            hash ^= sig.charCodeAt(i);
+            hash = Math.imul(hash, 0x01000193) >>> 0;
+        }
+    }
+    return { title: document.title, skeleton: hash.toString(16), count: nodes.length };
+}
+"""
+
+
+def path_template(url: str) -> str:
+    """URL path with record ids replaced, e.g. /orders/1234/edit → /orders/:id/edit."""
+    segments = urlparse(url).path.split("/")
+    return "/".join(":id" if _ID_SEGMENT_RE.match(s) else s for s in segments) or "/"
+
+
+def page_fingerprint(page: Page) -> Optional[Dict[str, str]]:
+    """
+    Cheap structural identity of the current page: path template, title and
+    interactive-skeleton hash (one page.evaluate).  None if it cannot be read.
+    """
+    try:
+        shape = page.evaluate(_SKELETON_JS)
+    except Exception:
+        logger.debug("Page fingerprint failed", exc_info=True)
+        return None
+    return {
+        "path": path_template(page.url),
+        "title": shape["title"],
+        "skeleton": f"{shape['skeleton']}:{shape['count']}",
+    }
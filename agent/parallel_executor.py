@@ -1,34 +1,112 @@
 # agent/parallel_executor.py
 
+import logging
+import multiprocessing
 from typing import Any, Optional
+
+from .config import Config
 from .executor import Executor
 
+logger = logging.getLogger(__name__)
+
+# Per-process executor, created once by the pool initializer so that the
+# selector cache and healer state are reused across the sets a worker runs.
+_worker_executor: Optional[Executor] = None
+
+
+def _init_worker() -> None:
+    global _worker_executor
+    _worker_executor = Executor()
+
+
+def _run_indexed(job: tuple) -> dict:
+    """Pool entry point: execute one (index, actions, settings) job."""
+    i, actions, settings = job
+    return _run_one(_worker_executor, i, actions, settings)
+
+
+def _run_one(
+    executor: Executor, i: int, actions: list[Any], settings: Optional[Any]
+) -> dict:
+    try:
+        result = executor.execute_actions(actions, settings=settings)
+        return {"status": "success", "result": result}
+    except Exception as e:
+        return {
+            "status": "failed",
+            "index": i,
+            "reason": str(e)
+        }
+
+
+def can_fork() -> bool:
+    """True if this platform supports the 'fork' start method."""
+    return "fork" in multiprocessing.get_all_start_methods()
+
 
 class ParallelExecutor:
     """
-    Windows-safe: run tests sequentially.
-    Parallel Playwright is NOT supported on Windows.
+    Run many action sets across a pool of worker processes.
+
+    Each worker owns its own Executor and therefore its own
+    sync_playwright() instance and browser — Playwright's sync API is not
+    shareable across processes.  Results are returned in input order.
+
+    Falls back to running sets sequentially in-process when the platform
+    cannot fork (e.g. Windows, where parallel Playwright is not supported),
+    when max_workers is 1, or when there is only one set to run.
     """
 
-    def __init__(self):
-        self.executor = Executor()
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers if max_workers is not None else Config.MAX_WORKERS
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        """In-process executor for the sequential path (created lazily)."""
+        if self._executor is None:
+            self._executor = Executor()
+        return self._executor
 
     def run_parallel(
         self,
         list_of_actions_sets: list[list[Any]],
         settings: Optional[Any] = None
     ) -> list[dict]:
-        results = []
-
-        for i, actions in enumerate(list_of_actions_sets):
-            try:
-                result = self.executor.execute_actions(actions, settings=settings)
-                results.append({"status": "success", "result": result})
-            except Exception as e:
-                results.append({
-                    "status": "failed",
-                    "index": i,
-                    "reason": str(e)
-                })
-
-        return results
\ No newline at end of file
+        workers = min(self.max_workers, len(list_of_actions_sets))
+
+        if workers <= 1 or not can_fork():
+            return self._run_sequential(list_of_actions_sets, settings)
+
+        logger.info(
+            "Running %d action sets on %d worker processes",
+            len(list_of_actions_sets), workers,
+        )
+        jobs = [
+            (i, actions, settings)
+            for i, actions in enumerate(list_of_actions_sets)
+        ]
+        ctx = multiprocessing.get_context("fork")
+        pool = ctx.Pool(processes=workers, initializer=_init_worker)
+        try:
+            # imap keeps input order; chunksize=1 lets fast workers pull
+            # the next set from the queue as soon as they finish.
+            results = list(pool.imap(_run_indexed, jobs, chunksize=1))
+        except BaseException:
+            pool.terminate()
+            raise
+        # close()/join() rather than the context manager's terminate(), so
+        # workers finish cleanly instead of being killed mid-write.
+        pool.close()
+        pool.join()
+        return results
+
+    def _run_sequential(
+        self,
+        list_of_actions_sets: list[list[Any]],
+        settings: Optional[Any] = None
+    ) -> list[dict]:
+        return [
+            _run_one(self.executor, i, actions, settings)
+            for i, actions in enumerate(list_of_actions_sets)
+        ]
@@ -0,0 +1,161 @@
+# agent/prefix_trie.py
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .session_cache import prefix_key
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Trie
+# ---------------------------------------------------------------------------
+
+class _TrieNode:
+    __slots__ = ("children", "owner")
+
+    def __init__(self, owner: int):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Index of the first test whose actions passed through this node.
+        self.owner = owner
+
+
+class ActionTrie:
+    """
+    Trie over parsed action lists.  Each edge is one action; each node
+    remembers the first test that reached it, so inserting a later test
+    tells us how deep it shares a prefix with an earlier one and which test
+    already ran that prefix.
+    """
+
+    def __init__(self):
+        self.root = _TrieNode(owner=-1)
+
+    @staticmethod
+    def _edge(action: Dict[str, Any]) -> str:
+        return json.dumps(action, sort_keys=True, default=str)
+
+    def insert(self, index: int, actions: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Add test *index* and return (shared_depth, owner): the number of
+        leading actions it shares with earlier tests and the earliest test
+        that ran them (-1 if none).
+        """
+        node, depth, owner = self.root, 0, -1
+        for action in actions:
+            child = node.children.get(self._edge(action))
+            if child is None:
+                break
+            node, depth, owner = child, depth + 1, child.owner
+
+        for action in actions[depth:]:
+            child = _TrieNode(owner=index)
+            node.children[self._edge(action)] = child
+            node = child
+        return depth, owner
+
+
+# ---------------------------------------------------------------------------
+# Plan
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ForkPlan:
+    """How one test runs: where it resumes and where it must checkpoint."""
+    resume_depth: int = 0
+    checkpoint_depths: Set[int] = field(default_factory=set)
+
+
+def plan_prefix_sharing(action_sets: List[Optional[List[Dict[str, Any]]]]) -> Dict[int, ForkPlan]:
+    """
+    Decide, for every test, how many leading steps it can skip and at which
+    depths it must snapshot state so later tests can fork from it.
+
+    Tests run in input order.  A test resumes from the deepest prefix it
+    shares with an earlier test, but always runs at least its last step in
+    its own context.  The snapshot is taken by the test on the fork chain
+    that actually executed that depth.
+    """
+    trie = ActionTrie()
+    plans: Dict[int, ForkPlan] = {}
+    source: Dict[int, int] = {}
+
+    for index, actions in enumerate(action_sets):
+        if not actions:
+            continue
+        shared, owner = trie.insert(index, actions)
+        plan = ForkPlan()
+        plans[index] = plan
+
+        depth = min(shared, len(actions) - 1)
+        if depth <= 0 or owner < 0:
+            continue
+
+        # Walk back along the fork chain to the test that executed `depth`.
+        runner = owner
+        while plans[runner].resume_depth > depth:
+            runner = source[runner]
+        if plans[runner].resume_depth < depth:
+            plans[runner].checkpoint_depths.add(depth)
+
+        plan.resume_depth = depth
+        source[index] = runner
+
+    return plans
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+class PrefixSharingRunner:
+    """
+    Runs the tests of one batch so that shared action prefixes execute once.
+
+    The graph still calls run() once per test, in order, with a fresh
+    executor — each call returns that test's own result dict.  Snapshots
+    (storage state, URL, variables and the logs so far) are captured at
+    branching depths and consumed by later tests, which continue in a new
+    context.  Only cookies and localStorage survive a fork; sessionStorage
+    and in-page JS state do not.
+    """
+
+    def __init__(self, action_sets: List[Optional[List[Dict[str, Any]]]], settings, session):
+        self.action_sets = action_sets
+        self.settings = settings
+        self.session = session
+        self.plans = plan_prefix_sharing(action_sets)
+        self.checkpoints: Dict[str, Dict[str, Any]] = {}
+
+    def _find_checkpoint(self, actions: List[Dict[str, Any]], depth: int) -> Optional[Dict[str, Any]]:
+        # If the planned snapshot is missing (its producer failed early),
+        # fall back to the deepest shallower one we do have.
+        for d in range(depth, 0, -1):
+            checkpoint = self.checkpoints.get(prefix_key(actions[:d]))
+            if checkpoint is not None:
+                return checkpoint
+        return None
+
+    def run(self, index: int, executor, settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run test *index*; *settings* overrides the batch settings for it."""
+        actions = self.action_sets[index]
+        plan = self.plans.get(index, ForkPlan())
+        resume_from = (
+            self._find_checkpoint(actions, plan.resume_depth)
+            if plan.resume_depth
+            else None
+        )
+        if plan.resume_depth and resume_from is None:
+            logger.info("Test %d: shared prefix unavailable — running from scratch", index + 1)
+
+        return executor.execute_actions(
+            actions,
+            settings=self.settings if settings is None else settings,
+            session=self.session,
+            resume_from=resume_from,
+            checkpoint_depths=plan.checkpoint_depths,
+            checkpoints=self.checkpoints,
+        )
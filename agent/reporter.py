@@ -124,6 +124,10 @@ class Reporter:
             "success": exec_result["success"],
             "logs": exec_result["logs"],
             "screenshots": exec_result.get("screenshots", []),
+            "video": exec_result.get("video"),
+            "video_bytes": exec_result.get("video_bytes", 0),
+            "video_bytes_discarded": exec_result.get("video_bytes_discarded", 0),
+            "trace": exec_result.get("trace"),
         }
 
         json_report_path = f"tests/report_{uid}.json"
@@ -158,6 +162,12 @@ class Reporter:
                 <h2>Step Details</h2>
                 <pre>{% for log in logs %}{{ log }}\n{% endfor %}</pre>
 
+                {% if trace %}
+                <h2>Playwright Trace</h2>
+                <p><a href="../{{ trace }}">{{ trace }}</a></p>
+                <p>Open with <code>playwright show-trace {{ trace }}</code> to inspect the DOM, network and console timeline.</p>
+                {% endif %}
+
                 {% if screenshots %}
                 <h2>Screenshots</h2>
                 {% for sc in screenshots %}
@@ -174,7 +184,8 @@ class Reporter:
             timestamp=report["timestamp"],
             success=report["success"],
             logs=report["logs"],
-            screenshots=report["screenshots"]
+            screenshots=report["screenshots"],
+            trace=report["trace"]
         )
 
         try:
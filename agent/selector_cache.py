@@ -1,45 +1,64 @@
 # agent/selector_cache.py
 
-import json
-import os
 import hashlib
+import math
+import threading
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from urllib.parse import urlparse  # moved to top, removed duplicate inside method
 
+from .cache_backends import CacheBackend, create_backend
+from .config import Config
+
 
 class SelectorCache:
     """
     Cache for successful selector healings to improve performance
     and reduce API calls to Grok.
+
+    Storage is pluggable (see cache_backends): a write-behind JSON file by
+    default, or a SQLite database shared safely by many processes when
+    SELECTOR_CACHE_BACKEND=sqlite.
+
+    Size is bounded by *max_entries* and *max_bytes*: when a new entry
+    pushes the cache over either limit, the lowest-scoring entries are
+    evicted down to 90% of it.  The score favours entries that are both
+    frequently hit and recently used (see _eviction_score).  A heal stored
+    at several fingerprint key levels is one entry for the count limit,
+    eviction and stats: its copies share a "group" and go together.
     """
 
-    def __init__(self, cache_file: str = "tests/selector_cache.json", ttl_days: int = 30):
-        self.cache_file = cache_file
+    # Evict down to this fraction of the limit so every set() near the
+    # limit doesn't trigger another eviction pass.
+    EVICT_TO = 0.9
+
+    def __init__(self, cache_file: Optional[str] = None, ttl_days: int = 30,
+                 stale_after: Optional[int] = None,
+                 backend: Optional[CacheBackend] = None,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 negative_ttl_minutes: Optional[int] = None):
+        self.backend = backend or create_backend(cache_file=cache_file)
+        self.cache_file = self.backend.location
         self.ttl_days = ttl_days
-        self.cache: Dict = self._load_cache()
-
-    def _load_cache(self) -> Dict:
-        """Load cache from file"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Cache load error: {e}")
-                return {}
-        return {}
-
-    def _save_cache(self):
-        """Save cache to file"""
-        try:
-            dir_name = os.path.dirname(self.cache_file)
-            if dir_name:  # guard against empty string when no directory in path
-                os.makedirs(dir_name, exist_ok=True)
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2)
-        except Exception as e:
-            print(f"Cache save error: {e}")
+        self.stale_after = Config.SELECTOR_CACHE_STALE_AFTER if stale_after is None else stale_after
+        self.max_entries = Config.SELECTOR_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_bytes = Config.SELECTOR_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.negative_ttl_minutes = (
+            Config.NEGATIVE_CACHE_TTL_MINUTES if negative_ttl_minutes is None
+            else negative_ttl_minutes
+        )
+
+        # Per-instance counters for get_stats().  Guarded by _lock, as is
+        # eviction: one cache may serve healers on several threads.
+        self._lock = threading.RLock()
+        self.lookups = 0
+        self.lookup_hits = 0
+        # Lookup hits by the method tag (HEURISTIC/SEMANTIC/AI) of the entry.
+        self.method_hits: Dict[str, int] = {}
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.invalidations = 0
+        self.negative_hits = 0
 
     def _generate_key(self, url: str, failed_selector: str, action_hint: str) -> str:
         """Generate unique cache key"""
@@ -48,78 +67,274 @@ class SelectorCache:
         key_string = f"{domain}:{failed_selector}:{action_hint}"
         return hashlib.md5(key_string.encode()).hexdigest()
 
-    def get(self, url: str, failed_selector: str, action_hint: str) -> Optional[str]:
-        """Get cached selector if available and not expired"""
-        key = self._generate_key(url, failed_selector, action_hint)
-
-        if key in self.cache:
-            entry = self.cache[key]
-            cached_time = datetime.fromisoformat(entry['timestamp'])
-
-            # Check if cache entry is still valid
-            if datetime.now() - cached_time < timedelta(days=self.ttl_days):
-                entry['hits'] = entry.get('hits', 0) + 1
-                self._save_cache()  # intentional: persist hit count
-                return entry['healed_selector']
-            else:
-                # Remove expired entry
-                del self.cache[key]
-                self._save_cache()
+    def _generate_keys(self, url: str, failed_selector: str, action_hint: str,
+                       fingerprint: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Cache keys from most to least specific.  With a page *fingerprint*
+        (see page_fingerprint.py) these are:
+          1. path template + title + skeleton hash + selector + hint
+          2. path template + title + skeleton hash + selector (any hint)
+          3. path template + selector + hint
+          4. domain + selector + hint (the plain key used without one)
+        """
+        legacy = self._generate_key(url, failed_selector, action_hint)
+        if not fingerprint:
+            return [legacy]
 
+        page = f"{urlparse(url).netloc}{fingerprint['path']}"
+        structure = f"{page}|{fingerprint['title']}|{fingerprint['skeleton']}"
+        levels = [
+            f"{structure}:{failed_selector}:{action_hint}",
+            f"{structure}:{failed_selector}",
+            f"{page}:{failed_selector}:{action_hint}",
+        ]
+        return [hashlib.md5(level.encode()).hexdigest() for level in levels] + [legacy]
+
+    @staticmethod
+    def _negative_key(key: str) -> str:
+        return f"neg:{key}"
+
+    def _cutoff(self) -> str:
+        return (datetime.now() - timedelta(days=self.ttl_days)).isoformat()
+
+    def _lookup(self, keys: List[str]) -> Optional[Tuple[str, Dict]]:
+        """First unexpired entry among *keys*; expired ones are removed."""
+        cutoff = self._cutoff()
+        for key in keys:
+            entry = self.backend.get(key)
+            if entry is None:
+                continue
+            if entry['timestamp'] >= cutoff:
+                return key, entry
+            self.backend.delete(key)
         return None
 
-    def set(self, url: str, failed_selector: str, action_hint: str, healed_selector: str, method: str = "AI"):
-        """Store successful healing in cache"""
-        key = self._generate_key(url, failed_selector, action_hint)
+    def get(self, url: str, failed_selector: str, action_hint: str,
+            fingerprint: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Get cached selector if available and not expired"""
+        with self._lock:
+            self.lookups += 1
+
+        match = self._lookup(self._generate_keys(url, failed_selector, action_hint, fingerprint))
+        if match is None:
+            return None
+
+        key, entry = match
+        self.backend.increment_hits(key, used_at=datetime.now().isoformat())
+        method = entry.get('method', 'unknown')
+        with self._lock:
+            self.lookup_hits += 1
+            self.method_hits[method] = self.method_hits.get(method, 0) + 1
+        return entry['healed_selector']
+
+    def set(self, url: str, failed_selector: str, action_hint: str, healed_selector: str,
+            method: str = "AI", fingerprint: Optional[Dict[str, str]] = None):
+        """Store successful healing in cache (under every key level)"""
+        keys = self._generate_keys(url, failed_selector, action_hint, fingerprint)
+        now = datetime.now().isoformat()
 
-        self.cache[key] = {
+        for key in keys:
+            self.backend.put(key, {
+                'group': keys[0],
+                'failed_selector': failed_selector,
+                'healed_selector': healed_selector,
+                'action_hint': action_hint,
+                'method': method,
+                'timestamp': now,
+                'last_used': now,
+                'hits': 0,
+                'url_pattern': urlparse(url).netloc if url else 'unknown'
+            })
+        # A tuple that heals now is no longer unhealable.
+        negative_key = self._negative_key(keys[0])
+        if self.backend.get(negative_key) is not None:
+            self.backend.delete(negative_key)
+        self._enforce_limits()
+
+    def invalidate(self, url: str, failed_selector: str, action_hint: str,
+                   fingerprint: Optional[Dict[str, str]] = None):
+        """Drop a healed selector that no longer works, at every key level"""
+        match = self._lookup(self._generate_keys(url, failed_selector, action_hint, fingerprint))
+        if match is None:
+            return
+        bad_selector = match[1]['healed_selector']
+        for key in self._generate_keys(url, failed_selector, action_hint, fingerprint):
+            entry = self.backend.get(key)
+            if entry is not None and entry['healed_selector'] == bad_selector:
+                self.backend.delete(key)
+        with self._lock:
+            self.invalidations += 1
+
+    def set_unhealable(self, url: str, failed_selector: str, action_hint: str,
+                       fingerprint: Optional[Dict[str, str]] = None):
+        """Remember for NEGATIVE_CACHE_TTL_MINUTES that healing this tuple failed"""
+        # Only the most specific key: the selector may still heal elsewhere.
+        key = self._negative_key(
+            self._generate_keys(url, failed_selector, action_hint, fingerprint)[0]
+        )
+        now = datetime.now()
+        self.backend.put(key, {
             'failed_selector': failed_selector,
-            'healed_selector': healed_selector,
+            'healed_selector': None,
             'action_hint': action_hint,
-            'method': method,
-            'timestamp': datetime.now().isoformat(),
+            'method': 'NEGATIVE',
+            'timestamp': now.isoformat(),
+            'last_used': now.isoformat(),
+            'expires': (now + timedelta(minutes=self.negative_ttl_minutes)).isoformat(),
             'hits': 0,
             'url_pattern': urlparse(url).netloc if url else 'unknown'
-        }
+        })
+        self._enforce_limits()
 
-        self._save_cache()
+    def is_unhealable(self, url: str, failed_selector: str, action_hint: str,
+                      fingerprint: Optional[Dict[str, str]] = None) -> bool:
+        """True while a negative entry for this tuple has not expired"""
+        key = self._negative_key(
+            self._generate_keys(url, failed_selector, action_hint, fingerprint)[0]
+        )
+        entry = self.backend.get(key)
+        if entry is None:
+            return False
+        if entry['expires'] > datetime.now().isoformat():
+            self.backend.increment_hits(key, used_at=datetime.now().isoformat())
+            with self._lock:
+                self.negative_hits += 1
+            return True
+        self.backend.delete(key)
+        return False
 
-    def clear_expired(self):
-        """Remove all expired cache entries"""
-        current_time = datetime.now()
-        expired_keys = []
+    @staticmethod
+    def _eviction_score(hits: int, last_used: str, now: datetime) -> float:
+        """
+        Higher is more worth keeping: log-scaled hit count (frequency)
+        minus the days since last use (recency), so a heavily used entry
+        survives a few idle days but not weeks.
+        """
+        try:
+            idle_days = (now - datetime.fromisoformat(last_used)).total_seconds() / 86400
+        except (TypeError, ValueError):
+            idle_days = float('inf')
+        return math.log2(1 + hits) - idle_days
+
+    def _enforce_limits(self):
+        """Evict the lowest-scoring entries once a size limit is exceeded"""
+        with self._lock:
+            count, nbytes = self.backend.size()
+            if count <= self.max_entries and nbytes <= self.max_bytes:
+                return
 
-        for key, entry in self.cache.items():
-            cached_time = datetime.fromisoformat(entry['timestamp'])
-            if current_time - cached_time >= timedelta(days=self.ttl_days):
-                expired_keys.append(key)
+            # Copies of one heal are scored and evicted together.
+            groups: Dict[str, Dict] = {}
+            for key, group, hits, last_used, entry_bytes in self.backend.usage():
+                usage = groups.setdefault(
+                    group, {'keys': [], 'hits': 0, 'last_used': '', 'bytes': 0}
+                )
+                usage['keys'].append(key)
+                usage['hits'] += hits
+                usage['last_used'] = max(usage['last_used'], last_used or '')
+                usage['bytes'] += entry_bytes
 
-        for key in expired_keys:
-            del self.cache[key]
+            now = datetime.now()
+            ranked = sorted(
+                groups.values(),
+                key=lambda usage: self._eviction_score(usage['hits'], usage['last_used'], now),
+            )
+            target_count = int(self.max_entries * self.EVICT_TO)
+            target_bytes = int(self.max_bytes * self.EVICT_TO)
 
-        if expired_keys:
-            self._save_cache()
-            print(f"Cleared {len(expired_keys)} expired cache entries")
+            evicted = []
+            for usage in ranked:
+                if count <= target_count and nbytes <= target_bytes:
+                    break
+                evicted.extend(usage['keys'])
+                count -= 1
+                nbytes -= usage['bytes']
+                self.evicted_bytes += usage['bytes']
+                self.evictions += 1
+
+            self.backend.delete_many(evicted)
+
+    def record_race(self, url: str, failed_selector: str, action_hint: str, cached_won: bool,
+                    fingerprint: Optional[Dict[str, str]] = None):
+        """
+        Record whether the cached selector beat the original one.  An entry
+        that loses STALE_AFTER races in a row (the original works again, or
+        the healed selector no longer matches) is dropped.
+        """
+        match = self._lookup(self._generate_keys(url, failed_selector, action_hint, fingerprint))
+        if match is None:
+            return
+        key, entry = match
+
+        if cached_won:
+            entry['wins'] = entry.get('wins', 0) + 1
+            entry['consecutive_losses'] = 0
+        else:
+            entry['consecutive_losses'] = entry.get('consecutive_losses', 0) + 1
+            if entry['consecutive_losses'] >= self.stale_after:
+                self.backend.delete(key)
+                return
+        self.backend.put(key, entry)
+
+    def flush(self):
+        """Persist buffered writes and hit counts"""
+        self.backend.flush()
+
+    def clear_expired(self):
+        """Remove all expired cache entries"""
+        removed = self.backend.delete_older_than(self._cutoff())
+        if removed:
+            print(f"Cleared {removed} expired cache entries")
 
     def get_stats(self) -> Dict:
         """Get cache statistics"""
-        total_entries = len(self.cache)
-        total_hits = sum(entry.get('hits', 0) for entry in self.cache.values())
+        with self._lock:
+            method_hits = dict(self.method_hits)
+        # One entry per group: fingerprint key levels hold copies of a heal.
+        groups: Dict[str, Dict] = {}
+        for key, entry in self.backend.entries().items():
+            group = groups.setdefault(
+                entry.get('group', key), {'method': entry.get('method', 'unknown'), 'hits': 0}
+            )
+            group['hits'] += entry.get('hits', 0)
+        total_hits = sum(group['hits'] for group in groups.values())
 
         methods = {}
-        for entry in self.cache.values():
-            method = entry.get('method', 'unknown')
+        hits_by_method = {}
+        negative_entries = 0
+        for group in groups.values():
+            method = group['method']
+            if method == 'NEGATIVE':
+                negative_entries += 1
+                continue
             methods[method] = methods.get(method, 0) + 1
+            hits_by_method[method] = hits_by_method.get(method, 0) + group['hits']
 
         return {
-            'total_entries': total_entries,
+            'total_entries': len(groups),
+            'negative_entries': negative_entries,
             'total_hits': total_hits,
+            'total_bytes': self.backend.size()[1],
             'methods': methods,
+            'hits_by_method': hits_by_method,
+            'lookups': self.lookups,
+            'hit_ratio': round(self.lookup_hits / self.lookups, 3) if self.lookups else 0.0,
+            # Share of this instance's lookups answered by each method's entries.
+            'method_hit_rates': {
+                method: round(hits / self.lookups, 3)
+                for method, hits in method_hits.items()
+            },
+            'evictions': self.evictions,
+            'evicted_bytes': self.evicted_bytes,
+            'invalidations': self.invalidations,
+            'negative_hits': self.negative_hits,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'backend': self.backend.name,
             'cache_file': self.cache_file
         }
 
     def clear_all(self):
         """Clear entire cache"""
-        self.cache = {}
-        self._save_cache()
-        print("Cache cleared")
\ No newline at end of file
+        self.backend.clear()
+        print("Cache cleared")
@@ -0,0 +1,118 @@
+# agent/selector_probe.py
+
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from playwright.sync_api import Page
+
+logger = logging.getLogger(__name__)
+
+# Tests every selector in one round trip.  Invalid CSS (Playwright-only
+# syntax such as :has-text() or text=) throws inside querySelectorAll and is
+# reported as valid=false so the caller can fall back to a locator.
+_PROBE_JS = """
+(selectors) => selectors.map(sel => {
+    try {
+        const matches = document.querySelectorAll(sel);
+        let visible = 0;
+        for (const el of matches) {
+            if (el.getClientRects().length > 0
+                    && getComputedStyle(el).visibility !== 'hidden') {
+                visible++;
+            }
+        }
+        return { valid: true, count: matches.length, visible };
+    } catch (e) {
+        return { valid: false, count: 0, visible: 0 };
+    }
+})
+"""
+
+
+@dataclass
+class ProbeResult:
+    selector: str
+    # False when the selector is not plain CSS and was counted via a locator.
+    valid: bool
+    count: int
+    visible: int
+
+
+def split_selector_list(selector: str) -> List[str]:
+    """
+    Split a comma-separated selector list at top-level commas only, e.g.
+    "input[name='a,b'], button:has-text('Log in, now')" → two selectors.
+    """
+    parts: List[str] = []
+    depth, quote, start = 0, None, 0
+    for i, ch in enumerate(selector):
+        if quote:
+            if ch == quote and selector[i - 1] != "\\":
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth = max(depth - 1, 0)
+        elif ch == "," and depth == 0:
+            parts.append(selector[start:i].strip())
+            start = i + 1
+    parts.append(selector[start:].strip())
+    return [p for p in parts if p]
+
+
+def probe_selectors(page: Page, selectors: Iterable[str]) -> List[ProbeResult]:
+    """Match count and visible count for every selector, in input order."""
+    selectors = list(selectors)
+    if not selectors:
+        return []
+    try:
+        raw = page.evaluate(_PROBE_JS, selectors)
+    except Exception:
+        logger.debug("Selector probe failed", exc_info=True)
+        raw = [{"valid": False, "count": 0, "visible": 0}] * len(selectors)
+
+    results: List[ProbeResult] = []
+    for selector, r in zip(selectors, raw):
+        result = ProbeResult(selector, r["valid"], r["count"], r["visible"])
+        if not result.valid:
+            # Playwright selector engines only exist on the Python side.
+            try:
+                result.count = page.locator(selector).count()
+                result.visible = (
+                    page.locator(f"{selector} >> visible=true").count()
+                    if result.count else 0
+                )
+            except Exception:
+                logger.debug("Locator probe failed for %r", selector, exc_info=True)
+        results.append(result)
+    return results
+
+
+def best_match(page: Page, selectors: Iterable[str], visible: bool = True) -> Optional[str]:
+    """
+    First selector (in priority order) with a visible match — or, with
+    visible=False, with any match.  None if nothing matches.
+    """
+    for result in probe_selectors(page, selectors):
+        if (result.visible if visible else result.count) > 0:
+            return result.selector
+    return None
+
+
+def race_selectors(page: Page, primary: str, alternate: str, timeout: int) -> Optional[str]:
+    """
+    Wait until either selector has a visible match and return the one that
+    does (*primary* when both do), or None if neither appears in *timeout* ms.
+    """
+    try:
+        # Filter to visible matches first so a hidden element that comes
+        # earlier in the DOM cannot hold up .first.
+        page.locator(f"{primary} >> visible=true").or_(
+            page.locator(f"{alternate} >> visible=true")
+        ).first.wait_for(state="visible", timeout=timeout)
+    except Exception:
+        return None
+    return best_match(page, [primary, alternate])
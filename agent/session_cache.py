@@ -0,0 +1,111 @@
+# agent/session_cache.py
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Actions that may appear in a login prefix.  Anything else (assertions,
+# extraction, JS) ends the scan — those steps are the test, not the setup.
+_PREFIX_ACTIONS = {"goto", "type", "click", "press_key"}
+
+
+def find_login_prefix(actions: List[Dict[str, Any]]) -> int:
+    """
+    Return the length of the leading login prefix of *actions*, or 0.
+
+    A login prefix is a run of goto/type/click/press_key steps that types
+    into a password field and is then submitted by a click or key press,
+    e.g. goto → type username → type password → click login.
+    """
+    typed_password = False
+    for i, action in enumerate(actions):
+        action_type = action.get("action")
+        if action_type not in _PREFIX_ACTIONS:
+            return 0
+        if action_type == "type" and "password" in str(action.get("field", "")).lower():
+            typed_password = True
+        elif action_type in ("click", "press_key") and typed_password:
+            return i + 1
+    return 0
+
+
+def prefix_key(actions: List[Dict[str, Any]]) -> str:
+    """Stable hash of a list of actions (key order independent)."""
+    payload = json.dumps(actions, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SessionCache:
+    """
+    Cache of authenticated browser state keyed by the hash of the action
+    prefix that produced it.
+
+    Each entry stores Playwright's context.storage_state() (cookies and
+    localStorage) plus the URL the prefix ended on, so a later test can
+    start from a restored context instead of replaying its login steps.
+    Entries expire after *ttl_minutes* and are dropped by invalidate() when
+    a restored session turns out to be logged out.
+
+    Snapshots contain live session cookies — keep *cache_dir* out of
+    version control.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl_minutes: Optional[int] = None):
+        self.cache_dir = cache_dir or Config.SESSION_CACHE_DIR
+        self.ttl_minutes = (
+            Config.SESSION_CACHE_TTL_MINUTES if ttl_minutes is None else ttl_minutes
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {"storage_state", "url", "timestamp"} or None if missing/expired."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            created = datetime.fromisoformat(entry["timestamp"])
+        except Exception:
+            logger.warning("Session cache entry %s is unreadable — dropping it", key)
+            self.invalidate(key)
+            return None
+
+        if datetime.now() - created >= timedelta(minutes=self.ttl_minutes):
+            self.invalidate(key)
+            return None
+        return entry
+
+    def set(self, key: str, storage_state: Dict[str, Any], url: str) -> None:
+        """Store a snapshot for *key*."""
+        entry = {
+            "storage_state": storage_state,
+            "url": url,
+            "timestamp": datetime.now().isoformat(),
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            logger.exception("Session cache save error")
+
+    def invalidate(self, key: str) -> None:
+        """Forget the snapshot for *key* (e.g. the session was logged out)."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.exception("Session cache invalidate error")
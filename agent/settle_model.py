@@ -0,0 +1,117 @@
+# agent/settle_model.py
+
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Fixed post-action idle wait used without history; learned budgets never
+# exceed it, so a page that never goes idle cannot make waits slower.
+DEFAULT_IDLE_TIMEOUT_MS = 2000
+
+
+@dataclass
+class SettleBudget:
+    """Post-action wait learned for one domain + action type."""
+    idle_timeout_ms: int
+    skip_idle: bool
+
+
+class SettleTimeModel:
+    """
+    Per-domain record of how long pages took to settle after each action
+    type, persisted as JSON so the budget improves across runs.
+
+    Each key ("example.com|click") keeps the most recent settle times in
+    milliseconds and, for each, whether the action triggered any network
+    request.  budget() returns None until *min_samples* are known, so the
+    caller keeps its conservative defaults for unfamiliar sites.
+
+    A settle time is when the last request finished, but the idle wait only
+    succeeds NETWORK_IDLE_QUIET_MS later, so the budget is p95 + that quiet
+    period + the margin.  Waits that time out are recorded as censored
+    samples at their timeout (the page took at least that long); dropping
+    them would leave only the fast samples and shrink the budget further.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        margin_ms: Optional[int] = None,
+        min_samples: Optional[int] = None,
+        max_samples: Optional[int] = None,
+        quiet_ms: Optional[int] = None,
+    ):
+        self.path = path or Config.SETTLE_MODEL_PATH
+        self.margin_ms = Config.SETTLE_MODEL_MARGIN_MS if margin_ms is None else margin_ms
+        self.min_samples = Config.SETTLE_MODEL_MIN_SAMPLES if min_samples is None else min_samples
+        self.max_samples = Config.SETTLE_MODEL_MAX_SAMPLES if max_samples is None else max_samples
+        self.quiet_ms = Config.NETWORK_IDLE_QUIET_MS if quiet_ms is None else quiet_ms
+        self.entries: Dict[str, Dict[str, List]] = self._load()
+        # Samples recorded by this instance but not yet written to disk.
+        self._pending: Dict[str, Dict[str, List]] = {}
+
+    @staticmethod
+    def key(url: str, action_type: str) -> str:
+        return f"{(urlparse(url).hostname or '').lower()}|{action_type}"
+
+    def _load(self) -> Dict[str, Dict[str, List]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            logger.warning("Settle model %s is unreadable — starting empty", self.path)
+            return {}
+
+    def _trim(self, entry: Dict[str, List]) -> None:
+        entry["settle_ms"] = entry["settle_ms"][-self.max_samples:]
+        entry["network"] = entry["network"][-self.max_samples:]
+
+    def record(self, url: str, action_type: str, settle_ms: float, had_network: bool) -> None:
+        """Add one observation for *url*'s domain and *action_type*."""
+        key = self.key(url, action_type)
+        for store in (self.entries, self._pending):
+            entry = store.setdefault(key, {"settle_ms": [], "network": []})
+            entry["settle_ms"].append(round(settle_ms))
+            entry["network"].append(had_network)
+            self._trim(entry)
+
+    def budget(self, url: str, action_type: str) -> Optional[SettleBudget]:
+        """Learned wait for this domain/action, or None without enough history."""
+        entry = self.entries.get(self.key(url, action_type))
+        if not entry or len(entry["settle_ms"]) < self.min_samples:
+            return None
+        samples = sorted(entry["settle_ms"])
+        p95 = samples[min(len(samples) - 1, math.ceil(0.95 * len(samples)) - 1)]
+        timeout = min(p95 + self.quiet_ms + self.margin_ms, DEFAULT_IDLE_TIMEOUT_MS)
+        return SettleBudget(idle_timeout_ms=int(timeout), skip_idle=not any(entry["network"]))
+
+    def save(self) -> None:
+        """Merge this instance's new samples into the file on disk."""
+        if not self._pending:
+            return
+        merged = self._load()
+        for key, pending in self._pending.items():
+            entry = merged.setdefault(key, {"settle_ms": [], "network": []})
+            entry["settle_ms"].extend(pending["settle_ms"])
+            entry["network"].extend(pending["network"])
+            self._trim(entry)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self.entries = merged
+            self._pending = {}
+        except Exception:
+            logger.exception("Settle model save error")
@@ -1,224 +1,333 @@
 # agent/smart_waits.py
 
 import time
-from typing import Optional, Callable
-from playwright.sync_api import Page
+from typing import Dict, Optional, Callable, Iterable, Set
+from playwright.sync_api import Page, Request, TimeoutError as PlaywrightTimeoutError, expect
+
+from .config import Config
+from .settle_model import DEFAULT_IDLE_TIMEOUT_MS, SettleTimeModel
+
+# Long-lived connections never "finish", so they would keep the page busy
+# forever.  Matched by resource type in addition to the URL patterns.
+_IGNORED_RESOURCE_TYPES = {"eventsource", "websocket"}
+
+# Text waits run inside the page against rendered text (innerText skips
+# markup, attributes and hidden nodes), so only a boolean crosses the wire.
+_TEXT_PRESENT_JS = """
+({ needle, exact, present }) => {
+    const haystack = document.body ? document.body.innerText.toLowerCase() : '';
+    const found = exact
+        ? needle.split(/\\s+/).filter(Boolean).every(word => haystack.includes(word))
+        : haystack.includes(needle);
+    return found === present;
+}
+"""
+
+# Descend from <body> into the visible child whose text still contains the
+# needle; the deepest such element is the match.  Returns a CSS selector
+# (#id when available, otherwise an nth-of-type path) or null.
+_TEXT_ELEMENT_JS = """
+(needle) => {
+    const isVisible = el => el.getClientRects().length > 0;
+    const contains = el => (el.innerText || '').toLowerCase().includes(needle);
+    let node = document.body;
+    if (!node || !contains(node)) return null;
+    for (;;) {
+        const next = Array.from(node.children).find(c => isVisible(c) && contains(c));
+        if (!next) break;
+        node = next;
+    }
+    const parts = [];
+    for (let el = node; el && el !== document.body; el = el.parentElement) {
+        if (el.id) {
+            parts.unshift('#' + CSS.escape(el.id));
+            return parts.join(' > ');
+        }
+        const tag = el.tagName.toLowerCase();
+        const siblings = Array.from(el.parentElement.children).filter(c => c.tagName === el.tagName);
+        parts.unshift(siblings.length > 1 ? `${tag}:nth-of-type(${siblings.indexOf(el) + 1})` : tag);
+    }
+    parts.unshift('body');
+    return parts.join(' > ');
+}
+"""
+
+# document.getAnimations() lists only what is actually animating, so no
+# per-element getComputedStyle() pass (and the style recalc it forces) is
+# needed.  Resolves when every finite animation's `finished` promise has
+# settled or the timeout elapses, whichever comes first.
+_ANIMATIONS_SETTLED_JS = """
+async (timeout) => {
+    const start = performance.now();
+    const running = document.getAnimations().filter(a => {
+        if (a.playState !== 'running') return false;
+        const timing = a.effect ? a.effect.getComputedTiming() : null;
+        return !(timing && timing.endTime === Infinity);
+    });
+    if (running.length === 0) return { settled: true, waited_ms: 0 };
+
+    let timer;
+    const settled = await Promise.race([
+        Promise.all(running.map(a => a.finished.catch(() => null))).then(() => true),
+        new Promise(resolve => { timer = setTimeout(() => resolve(false), timeout); }),
+    ]);
+    clearTimeout(timer);
+    return { settled, waited_ms: performance.now() - start };
+}
+"""
+
+
+class NetworkIdleTracker:
+    """
+    Counts a page's in-flight requests from its request / requestfinished /
+    requestfailed events.
+
+    The page is idle once nothing is in flight and no request has started or
+    ended for the quiet window.  Requests whose URL contains one of
+    *ignore_patterns* (long-polling, socket endpoints) are not counted.
+    Attach right after new_page() — requests started earlier are not seen.
+    """
+
+    def __init__(self, page: Page, ignore_patterns: Optional[Iterable[str]] = None):
+        self.page = page
+        self.ignore_patterns = tuple(
+            Config.NETWORK_IDLE_IGNORE_PATTERNS if ignore_patterns is None else ignore_patterns
+        )
+        self._in_flight: Set[int] = set()
+        self.last_activity = time.monotonic()
+        # Total counted requests since attach (lets callers tell whether an
+        # action triggered any traffic).
+        self.request_count = 0
+
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def _is_ignored(self, request: Request) -> bool:
+        if request.resource_type in _IGNORED_RESOURCE_TYPES:
+            return True
+        url = request.url.lower()
+        return any(pattern in url for pattern in self.ignore_patterns)
+
+    def _on_request(self, request: Request) -> None:
+        if self._is_ignored(request):
+            return
+        self._in_flight.add(id(request))
+        self.request_count += 1
+        self.last_activity = time.monotonic()
+
+    def _on_done(self, request: Request) -> None:
+        if id(request) in self._in_flight:
+            self._in_flight.discard(id(request))
+            self.last_activity = time.monotonic()
+
+    def wait_for_idle(self, timeout: int = 5000, idle_time: int = 500) -> bool:
+        """Return True once the page has been quiet for *idle_time* ms."""
+        deadline = time.monotonic() + timeout / 1000
+        while True:
+            now = time.monotonic()
+            if not self._in_flight and (now - self.last_activity) * 1000 >= idle_time:
+                return True
+            if now >= deadline:
+                return False
+            # Sleeping inside Playwright (not time.sleep) lets the sync API
+            # dispatch the request events that update the counter.
+            try:
+                self.page.wait_for_timeout(min(50, max(int((deadline - now) * 1000), 1)))
+            except Exception as e:
+                print(f"[wait_network_idle] Error: {e}")
+                return False
 
 
 class SmartWait:
     """
     Enhanced smart wait strategies for reliable test execution
+
+    Element, attribute, count, readiness and URL waits are delegated to
+    Playwright (locator waits, expect() and wait_for_function), which
+    re-check their condition inside the browser and resolve as soon as it
+    holds — one round trip per wait instead of a query_selector +
+    time.sleep loop.  Every wait still returns True/False and never raises.
     """
 
+    def __init__(self, settle_model: Optional[SettleTimeModel] = None):
+        # Learned per-domain post-action budgets (None: fixed defaults).
+        self.settle_model = settle_model
+        # tracker.request_count when begin_action() was called.
+        self._requests_before: Optional[int] = None
+        # NetworkIdleTracker per open page, keyed by id(page).
+        self._trackers: Dict[int, NetworkIdleTracker] = {}
+        # Milliseconds the last wait_for_animations() call actually waited.
+        self.last_animation_wait_ms: float = 0.0
+
+    @staticmethod
+    def _remaining_ms(deadline: float) -> int:
+        """Milliseconds left until *deadline* (a time.monotonic() value)."""
+        return max(int((deadline - time.monotonic()) * 1000), 1)
+
     def wait_dom_ready(self, page: Page, timeout: int = 5000) -> bool:
         """Wait until document.readyState == 'complete'"""
-        start = time.time() * 1000
-        while (time.time() * 1000) - start < timeout:
-            try:
-                state = page.evaluate("document.readyState")
-                if state == "complete":
-                    return True
-            except Exception as e:
-                print(f"[wait_dom_ready] Error: {e}")
-            time.sleep(0.2)
-        return False
-
-    def wait_network_idle(self, page: Page, timeout: int = 5000, idle_time: int = 500) -> bool:
-        """Wait until network has no new requests for specified idle time"""
-        start = time.time() * 1000
         try:
-            prev_count = page.evaluate("() => window.performance.getEntries().length")
+            page.wait_for_function(
+                "() => document.readyState === 'complete'", timeout=timeout
+            )
+            return True
+        except PlaywrightTimeoutError:
+            return False
         except Exception as e:
-            print(f"[wait_network_idle] Initial count error: {e}")
+            print(f"[wait_dom_ready] Error: {e}")
             return False
 
-        while (time.time() * 1000) - start < timeout:
-            time.sleep(idle_time / 1000)
-            try:
-                new_count = page.evaluate("() => window.performance.getEntries().length")
-                if new_count == prev_count:
-                    return True
-                prev_count = new_count
-            except Exception as e:
-                print(f"[wait_network_idle] Error: {e}")
-
-        return False
+    def track_network(self, page: Page) -> NetworkIdleTracker:
+        """Attach (once) and return the network idle tracker for *page*."""
+        key = id(page)
+        tracker = self._trackers.get(key)
+        if tracker is None:
+            tracker = NetworkIdleTracker(page)
+            self._trackers[key] = tracker
+            page.on("close", lambda _: self._trackers.pop(key, None))
+        return tracker
+
+    def wait_network_idle(self, page: Page, timeout: int = 5000,
+                          idle_time: Optional[int] = None) -> bool:
+        """Wait until no request has been in flight for idle_time ms"""
+        if idle_time is None:
+            idle_time = Config.NETWORK_IDLE_QUIET_MS
+        return self.track_network(page).wait_for_idle(timeout=timeout, idle_time=idle_time)
 
     def wait_for_element(self, page: Page, selector: str, timeout: int = 5000,
                          visible: bool = True) -> bool:
         """Wait for element to exist and optionally be visible"""
-        start = time.time() * 1000
-
-        while (time.time() * 1000) - start < timeout:
-            try:
-                element = page.query_selector(selector)
-                if element:
-                    if visible:
-                        if element.is_visible():
-                            return True
-                    else:
-                        return True
-            except Exception as e:
-                print(f"[wait_for_element] Error: {e}")
-            time.sleep(0.3)
-
-        return False
+        try:
+            page.locator(selector).first.wait_for(
+                state="visible" if visible else "attached", timeout=timeout
+            )
+            return True
+        except PlaywrightTimeoutError:
+            return False
+        except Exception as e:
+            print(f"[wait_for_element] Error: {e}")
+            return False
 
     def wait_for_element_clickable(self, page: Page, selector: str, timeout: int = 5000) -> bool:
         """Wait for element to be clickable (visible and enabled)"""
-        start = time.time() * 1000
-
-        while (time.time() * 1000) - start < timeout:
-            try:
-                element = page.query_selector(selector)
-                if element:
-                    if element.is_visible() and element.is_enabled():
-                        return True
-            except Exception as e:
-                print(f"[wait_for_element_clickable] Error: {e}")
-            time.sleep(0.3)
-
-        return False
+        deadline = time.monotonic() + timeout / 1000
+        if not self.wait_for_element(page, selector, timeout=timeout):
+            return False
+        try:
+            handle = page.locator(selector).first.element_handle(
+                timeout=self._remaining_ms(deadline)
+            )
+            handle.wait_for_element_state("enabled", timeout=self._remaining_ms(deadline))
+            return True
+        except PlaywrightTimeoutError:
+            return False
+        except Exception as e:
+            print(f"[wait_for_element_clickable] Error: {e}")
+            return False
 
     def wait_for_text(self, page: Page, text: str, timeout: int = 5000,
                       exact: bool = False) -> bool:
         """Wait for specific text to appear on page.
         exact=True: all words in text must appear in page (word match).
         exact=False: text as a substring must appear in page (partial match).
+        Only rendered, visible text is searched — not markup or attributes.
         """
-        start = time.time() * 1000
-
-        while (time.time() * 1000) - start < timeout:
-            try:
-                content = page.content().lower()
-                search_text = text.lower()
-
-                if exact:
-                    # Word-level match: every word must appear somewhere
-                    words = search_text.split()
-                    if all(word in content for word in words):
-                        return True
-                else:
-                    # Substring match
-                    if search_text in content:
-                        return True
-            except Exception as e:
-                print(f"[wait_for_text] Error: {e}")
-            time.sleep(0.3)
-
-        return False
+        return self._wait_text_state(page, text, timeout, exact, present=True,
+                                     caller="wait_for_text")
 
     def wait_for_text_to_disappear(self, page: Page, text: str, timeout: int = 5000) -> bool:
         """Wait for specific text to disappear from page"""
-        start = time.time() * 1000
+        return self._wait_text_state(page, text, timeout, exact=False, present=False,
+                                     caller="wait_for_text_to_disappear")
 
-        while (time.time() * 1000) - start < timeout:
-            try:
-                content = page.content().lower()
-                if text.lower() not in content:
-                    return True
-            except Exception as e:
-                print(f"[wait_for_text_to_disappear] Error: {e}")
-            time.sleep(0.3)
+    def _wait_text_state(self, page: Page, text: str, timeout: int, exact: bool,
+                         present: bool, caller: str) -> bool:
+        try:
+            page.wait_for_function(
+                _TEXT_PRESENT_JS,
+                arg={"needle": text.lower(), "exact": exact, "present": present},
+                polling=100,
+                timeout=timeout,
+            )
+            return True
+        except PlaywrightTimeoutError:
+            return False
+        except Exception as e:
+            print(f"[{caller}] Error: {e}")
+            return False
 
-        return False
+    def find_text_element(self, page: Page, text: str) -> Optional[str]:
+        """Selector of the innermost visible element containing *text*, or None"""
+        try:
+            return page.evaluate(_TEXT_ELEMENT_JS, text.lower())
+        except Exception as e:
+            print(f"[find_text_element] Error: {e}")
+            return None
 
     def wait_for_element_count(self, page: Page, selector: str, count: int,
                                timeout: int = 5000) -> bool:
         """Wait for specific number of elements matching selector"""
-        start = time.time() * 1000
-
-        while (time.time() * 1000) - start < timeout:
-            try:
-                elements = page.query_selector_all(selector)
-                if len(elements) == count:
-                    return True
-            except Exception as e:
-                print(f"[wait_for_element_count] Error: {e}")
-            time.sleep(0.3)
-
-        return False
+        try:
+            expect(page.locator(selector)).to_have_count(count, timeout=timeout)
+            return True
+        except AssertionError:
+            return False
+        except Exception as e:
+            print(f"[wait_for_element_count] Error: {e}")
+            return False
 
     def wait_for_attribute(self, page: Page, selector: str, attribute: str,
                            value: str, timeout: int = 5000) -> bool:
         """Wait for element attribute to have specific value"""
-        start = time.time() * 1000
-
-        while (time.time() * 1000) - start < timeout:
-            try:
-                element = page.query_selector(selector)
-                if element:
-                    attr_value = element.get_attribute(attribute)
-                    if attr_value == value:
-                        return True
-            except Exception as e:
-                print(f"[wait_for_attribute] Error: {e}")
-            time.sleep(0.3)
-
-        return False
+        try:
+            expect(page.locator(selector).first).to_have_attribute(
+                attribute, value, timeout=timeout
+            )
+            return True
+        except AssertionError:
+            return False
+        except Exception as e:
+            print(f"[wait_for_attribute] Error: {e}")
+            return False
 
     def wait_for_animations(self, page: Page, timeout: int = 3000) -> bool:
-        """Wait for CSS animations and transitions to complete"""
+        """Wait for running CSS animations/transitions and Web Animations to finish.
+        Infinite animations (spinners, marquees) are ignored.  The time
+        actually waited is kept in self.last_animation_wait_ms.
+        """
+        self.last_animation_wait_ms = 0.0
         try:
-            page.evaluate("""
-                () => {
-                    return new Promise((resolve) => {
-                        const elements = document.querySelectorAll('*');
-                        let animating = false;
-
-                        elements.forEach(el => {
-                            const style = window.getComputedStyle(el);
-                            if (style.animationName !== 'none' || style.transitionProperty !== 'none') {
-                                animating = true;
-                            }
-                        });
-
-                        if (!animating) {
-                            resolve();
-                        } else {
-                            setTimeout(resolve, 500);
-                        }
-                    });
-                }
-            """)
-            return True
+            outcome = page.evaluate(_ANIMATIONS_SETTLED_JS, timeout)
+            self.last_animation_wait_ms = outcome["waited_ms"]
+            return outcome["settled"]
         except Exception as e:
             print(f"[wait_for_animations] Error: {e}")
             return False
 
     def wait_for_ajax(self, page: Page, timeout: int = 5000) -> bool:
         """Wait for AJAX requests to complete (jQuery or fetch)"""
-        start = time.time() * 1000
-
-        while (time.time() * 1000) - start < timeout:
-            try:
-                # Check jQuery AJAX if available
-                jquery_idle = page.evaluate("""
-                    () => {
-                        if (typeof jQuery !== 'undefined') {
-                            return jQuery.active === 0;
-                        }
-                        return true;
-                    }
-                """)
-
-                # Check pending fetch requests via injected counter (if available)
-                fetch_idle = page.evaluate("""
-                    () => {
-                        if (typeof window.__fetchPending !== 'undefined') {
-                            return window.__fetchPending === 0;
-                        }
-                        return true; // assume idle if not tracked
-                    }
-                """)
-
-                if jquery_idle and fetch_idle:
-                    return True
-            except Exception as e:
-                print(f"[wait_for_ajax] Error: {e}")
-            time.sleep(0.3)
-
-        return False
+        try:
+            # jQuery.active and the injected window.__fetchPending counter
+            # (if present) are both checked in-page on every animation frame.
+            page.wait_for_function("""
+                () => {
+                    const jqueryIdle = typeof jQuery === 'undefined' || jQuery.active === 0;
+                    const fetchIdle = typeof window.__fetchPending === 'undefined'
+                        || window.__fetchPending === 0;
+                    return jqueryIdle && fetchIdle;
+                }
+            """, timeout=timeout)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+        except Exception as e:
+            print(f"[wait_for_ajax] Error: {e}")
+            return False
 
     def wait_for_condition(self, page: Page, condition: Callable[[], bool],
                            timeout: int = 5000, poll_interval: int = 300) -> bool:
@@ -237,23 +346,60 @@ class SmartWait:
 
     def wait_for_url_change(self, page: Page, initial_url: str, timeout: int = 5000) -> bool:
         """Wait for URL to change from initial URL"""
-        start = time.time() * 1000
-
-        while (time.time() * 1000) - start < timeout:
-            try:
-                if page.url != initial_url:
-                    return True
-            except Exception as e:
-                print(f"[wait_for_url_change] Error: {e}")
-            time.sleep(0.3)
+        try:
+            page.wait_for_url(
+                lambda url: url != initial_url, timeout=timeout, wait_until="commit"
+            )
+            return True
+        except PlaywrightTimeoutError:
+            return False
+        except Exception as e:
+            print(f"[wait_for_url_change] Error: {e}")
+            return False
 
-        return False
+    def begin_action(self, page: Page) -> None:
+        """Mark the start of an action so its network traffic can be counted"""
+        self._requests_before = self.track_network(page).request_count
+
+    def _settle_after_action(self, page: Page, action_type: str) -> None:
+        """DOM-ready + network-idle wait sized by the settle model.
+        Without history the fixed 3000/2000 ms defaults apply.  Actions that
+        never caused network traffic skip the idle wait, unless this one did.
+        Settle time is measured from the end of the action.  A wait that
+        times out is recorded at its timeout as a censored sample, so the
+        budget grows back instead of only learning from fast pages.
+        """
+        started = time.monotonic()
+        tracker = self.track_network(page)
+        requests_before = (
+            tracker.request_count if self._requests_before is None else self._requests_before
+        )
+        self._requests_before = None
+        budget = self.settle_model.budget(page.url, action_type) if self.settle_model else None
+
+        self.wait_dom_ready(page, timeout=3000)
+        idle, idle_timeout = True, None
+        if budget is None:
+            idle_timeout = DEFAULT_IDLE_TIMEOUT_MS
+        elif not budget.skip_idle or tracker.request_count > requests_before:
+            idle_timeout = budget.idle_timeout_ms
+        if idle_timeout is not None:
+            idle = self.wait_network_idle(page, timeout=idle_timeout)
+
+        if self.settle_model is None:
+            return
+        had_network = tracker.request_count > requests_before
+        if not idle:
+            settle_ms = float(idle_timeout)
+        else:
+            settled_at = tracker.last_activity if had_network else time.monotonic()
+            settle_ms = max(settled_at - started, 0.0) * 1000
+        self.settle_model.record(page.url, action_type, settle_ms, had_network)
 
     def smart_wait_after_action(self, page: Page, action_type: str):
         """Intelligent wait after specific action types"""
         if action_type in ["goto", "click"]:
-            self.wait_dom_ready(page, timeout=3000)
-            self.wait_network_idle(page, timeout=2000)
+            self._settle_after_action(page, action_type)
         elif action_type in ["type", "select"]:
             time.sleep(0.2)
         elif action_type == "scroll":
@@ -0,0 +1,29 @@
+# agent/video_retention.py
+
+import logging
+import os
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def retain_video(
+    video_path: Optional[str], success: bool, video_mode: str
+) -> Tuple[Optional[str], int, int]:
+    """
+    Apply VIDEO_MODE to a finished recording (call after context.close()).
+
+    Returns (video_path, video_bytes, video_bytes_discarded): under
+    retain-on-failure the video of a passing test is deleted, so its path
+    becomes None and its size is reported as discarded.
+    """
+    if not video_path or not os.path.exists(video_path):
+        return video_path, 0, 0
+    video_bytes = os.path.getsize(video_path)
+    if success and video_mode == "retain-on-failure":
+        try:
+            os.remove(video_path)
+            return None, 0, video_bytes
+        except OSError:
+            logger.warning("Could not delete video of passing test")
+    return video_path, video_bytes, 0
@@ -0,0 +1,83 @@
+# tests/test_cache_backends.py
+
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from agent.cache_backends import CacheBackend, SQLiteCacheBackend
+
+
+def _entry(timestamp="2026-01-01T00:00:00", **extra):
+    entry = {
+        "failed_selector": "#old",
+        "healed_selector": "#new",
+        "action_hint": "click",
+        "method": "AI",
+        "timestamp": timestamp,
+        "last_used": timestamp,
+        "hits": 0,
+        "url_pattern": "shop.example.com",
+    }
+    entry.update(extra)
+    return entry
+
+
+def _rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT key, hits FROM selector_cache").fetchall())
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_json_cache_is_imported_once(tmp_path):
+    json_file = tmp_path / "selector_cache.json"
+    db_path = str(tmp_path / "selector_cache.db")
+    json_file.write_text(json.dumps({"a": _entry(hits=3), "b": _entry()}))
+
+    SQLiteCacheBackend(db_path, migrate_from=str(json_file))
+    assert _rows(db_path) == {"a": 3, "b": 0}
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+
+    # Later opens skip the import: deletions stick, new JSON entries are ignored.
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM selector_cache WHERE key = 'a'")
+    json_file.write_text(json.dumps({"a": _entry(), "c": _entry()}))
+    SQLiteCacheBackend(db_path, migrate_from=str(json_file))
+    assert _rows(db_path) == {"b": 0}
+
+
+def test_hit_increments_from_two_connections_add_up(tmp_path):
+    db_path = str(tmp_path / "selector_cache.db")
+    first, second = SQLiteCacheBackend(db_path), SQLiteCacheBackend(db_path)
+    first.put("key", _entry())
+
+    def bump(backend):
+        for _ in range(200):
+            backend.increment_hits("key", used_at="2026-02-01T00:00:00")
+            backend.flush()
+
+    threads = [threading.Thread(target=bump, args=(b,)) for b in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _rows(db_path) == {"key": 400}
+    assert first.get("key")["last_used"] == "2026-02-01T00:00:00"
+
+
+def test_delete_older_than(tmp_path):
+    db_path = str(tmp_path / "selector_cache.db")
+    backend = SQLiteCacheBackend(db_path)
+    backend.put("old", _entry(timestamp="2026-01-01T00:00:00"))
+    backend.put("new", _entry(timestamp="2026-03-01T00:00:00"))
+
+    assert backend.delete_older_than("2026-02-01T00:00:00") == 1
+    assert backend.get("old") is None
+    assert set(_rows(db_path)) == {"new"}
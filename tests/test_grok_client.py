@@ -0,0 +1,146 @@
+# tests/test_grok_client.py
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from agent.grok_client import GrokClient, get_grok_client
+
+_COMPLETION = {
+    "choices": [{"message": {"content": "  #login-button \n"}}],
+    "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+}
+
+
+class _StandIn:
+    """Local stand-in for the Grok API that replays scripted responses."""
+
+    def __init__(self):
+        # Each item: (status, headers, body, delay_s); the last one repeats.
+        self.script = []
+        self.requests = []
+        # Client port of every request (same port → same connection).
+        self.ports = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stand_in.requests.append(json.loads(body))
+                stand_in.ports.append(self.client_address[1])
+                step = min(len(stand_in.requests), len(stand_in.script)) - 1
+                status, headers, payload, delay = stand_in.script[step]
+                time.sleep(delay)
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    pass  # client gave up (read timeout)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = _StandIn()
+    yield server
+    server.close()
+
+
+def _client(stand_in, **kwargs):
+    kwargs.setdefault("backoff_ms", 10)
+    return GrokClient(api_url=stand_in.url, model="test-model", **kwargs)
+
+
+def test_chat_returns_content_and_records_usage(stand_in):
+    stand_in.script = [(200, {}, _COMPLETION, 0)]
+    client = _client(stand_in)
+
+    assert client.chat([{"role": "user", "content": "hi"}], "key", purpose="heal") == "#login-button"
+
+    assert stand_in.requests[0]["model"] == "test-model"
+    stats = client.get_stats()
+    assert stats["calls"] == 1 and stats["failures"] == 0
+    assert stats["prompt_tokens"] == 12 and stats["completion_tokens"] == 3
+    assert stats["recent"][0]["purpose"] == "heal"
+    assert stats["recent"][0]["status"] == 200
+
+
+def test_429_with_retry_after_is_retried(stand_in):
+    stand_in.script = [
+        (429, {"Retry-After": "1"}, {"error": "rate limited"}, 0),
+        (200, {}, _COMPLETION, 0),
+    ]
+    client = _client(stand_in)
+
+    start = time.monotonic()
+    assert client.chat([{"role": "user", "content": "hi"}], "key") == "#login-button"
+
+    assert time.monotonic() - start >= 1.0
+    assert len(stand_in.requests) == 2
+    assert client.get_stats()["retries"] == 1
+
+
+def test_persistent_5xx_raises_after_retries(stand_in):
+    stand_in.script = [(503, {}, {"error": "down"}, 0)]
+    client = _client(stand_in, max_retries=2)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.chat([{"role": "user", "content": "hi"}], "key")
+
+    assert len(stand_in.requests) == 3
+    assert client.get_stats()["failures"] == 1
+
+
+def test_read_timeout_is_not_retried(stand_in):
+    stand_in.script = [(200, {}, _COMPLETION, 1.0)]
+    client = _client(stand_in, max_retries=3)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.chat([{"role": "user", "content": "hi"}], "key", read_timeout_ms=200)
+
+    assert len(stand_in.requests) == 1
+    assert client.get_stats()["failures"] == 1
+
+
+def test_connections_are_reused(stand_in):
+    stand_in.script = [(200, {}, _COMPLETION, 0)]
+    client = _client(stand_in)
+    for _ in range(3):
+        client.chat([{"role": "user", "content": "hi"}], "key")
+
+    assert len(set(stand_in.ports)) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_gets_its_own_client():
+    parent_client = get_grok_client()
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if get_grok_client() is not parent_client else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert get_grok_client() is parent_client
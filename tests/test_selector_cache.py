@@ -0,0 +1,38 @@
+# tests/test_selector_cache.py
+
+from agent.cache_backends import JsonCacheBackend
+from agent.selector_cache import SelectorCache
+
+URL = "https://shop.example.com/cart"
+
+
+def _fingerprint(i):
+    return {"path": f"/page/{i}", "title": "Shop", "skeleton": "abc123"}
+
+
+def test_fingerprint_copies_count_as_one_entry(tmp_path):
+    cache = SelectorCache(backend=JsonCacheBackend(str(tmp_path / "cache.json")), max_entries=10)
+    for i in range(12):
+        cache.set(URL, f"#old-{i}", "click", f"#new-{i}", "AI", _fingerprint(i))
+
+    stats = cache.get_stats()
+    # The 11th heal evicts down to 90% of the limit: 2 heals, not their copies.
+    assert stats["evictions"] == 2
+    assert stats["total_entries"] == 10
+    assert stats["methods"] == {"AI": 10}
+    assert cache.get(URL, "#old-11", "click", _fingerprint(11)) == "#new-11"
+    assert cache.get(URL, "#old-0", "click", _fingerprint(0)) is None
+
+
+def test_negative_entries_stay_out_of_method_stats(tmp_path):
+    cache = SelectorCache(backend=JsonCacheBackend(str(tmp_path / "cache.json")))
+    cache.set(URL, "#old", "click", "#new", "SEMANTIC", _fingerprint(1))
+    cache.set_unhealable(URL, "#gone", "click", _fingerprint(1))
+    assert cache.get(URL, "#old", "click", _fingerprint(1)) == "#new"
+    assert cache.is_unhealable(URL, "#gone", "click", _fingerprint(1))
+
+    stats = cache.get_stats()
+    assert stats["total_entries"] == 2
+    assert stats["negative_entries"] == 1
+    assert stats["methods"] == {"SEMANTIC": 1}
+    assert stats["hits_by_method"] == {"SEMANTIC": 1}
@@ -0,0 +1,84 @@
+# tests/test_settle_model.py
+
+import random
+
+from agent.settle_model import DEFAULT_IDLE_TIMEOUT_MS, SettleTimeModel
+
+URL = "https://shop.example.com/cart"
+
+
+def _model(tmp_path, **kwargs):
+    kwargs.setdefault("margin_ms", 250)
+    kwargs.setdefault("min_samples", 5)
+    kwargs.setdefault("max_samples", 50)
+    kwargs.setdefault("quiet_ms", 500)
+    return SettleTimeModel(path=str(tmp_path / "settle_times.json"), **kwargs)
+
+
+def _settle(model, settle_ms):
+    """
+    One click the way SmartWaits._settle_after_action handles it: the idle
+    wait succeeds only if the quiet period fits in the timeout after the
+    last request, and a timed-out wait is recorded at its timeout.
+    """
+    budget = model.budget(URL, "click")
+    timeout = DEFAULT_IDLE_TIMEOUT_MS if budget is None else budget.idle_timeout_ms
+    idle = settle_ms + model.quiet_ms <= timeout
+    model.record(URL, "click", settle_ms if idle else timeout, had_network=True)
+    return idle
+
+
+def test_no_budget_until_min_samples(tmp_path):
+    model = _model(tmp_path)
+    for _ in range(4):
+        model.record(URL, "click", 100, had_network=True)
+    assert model.budget(URL, "click") is None
+
+    model.record(URL, "click", 100, had_network=True)
+    assert model.budget(URL, "click").idle_timeout_ms == 100 + 500 + 250
+
+
+def test_budget_is_capped_at_default(tmp_path):
+    model = _model(tmp_path)
+    for _ in range(5):
+        model.record(URL, "click", 1800, had_network=True)
+    assert model.budget(URL, "click").idle_timeout_ms == DEFAULT_IDLE_TIMEOUT_MS
+
+
+def test_skip_idle_only_without_network(tmp_path):
+    model = _model(tmp_path)
+    for _ in range(5):
+        model.record(URL, "click", 20, had_network=False)
+    assert model.budget(URL, "click").skip_idle
+
+    model.record(URL, "click", 300, had_network=True)
+    assert not model.budget(URL, "click").skip_idle
+
+
+def test_budget_does_not_collapse_under_timeouts(tmp_path):
+    model = _model(tmp_path)
+    rng = random.Random(0)
+    # Mostly fast clicks, one in five waits on a ~900 ms request.
+    results = [
+        _settle(model, rng.uniform(600, 1000) if rng.random() < 0.2 else rng.uniform(50, 150))
+        for _ in range(2000)
+    ]
+
+    # Every click fits in the default timeout, so the learned budget must
+    # keep room for the slow ones instead of shrinking to the fast ones.
+    assert model.budget(URL, "click").idle_timeout_ms >= 1000 + 500
+    assert results.count(False) / len(results) < 0.02
+
+
+def test_censored_samples_grow_the_budget_back(tmp_path):
+    model = _model(tmp_path)
+    for _ in range(50):
+        model.record(URL, "click", 100, had_network=True)
+    assert model.budget(URL, "click").idle_timeout_ms == 850
+
+    # The page gets slower: the first waits time out, then the budget follows.
+    results = [_settle(model, 1200) for _ in range(20)]
+
+    assert not results[0]
+    assert all(results[-10:])
+    assert model.budget(URL, "click").idle_timeout_ms == DEFAULT_IDLE_TIMEOUT_MS
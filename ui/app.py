@@ -1,5 +1,7 @@
+import logging
 import sys
 import os
+from contextlib import ExitStack, contextmanager
 
 # asyncio.WindowsProactorEventLoopPolicy is deprecated in Python 3.14+
 # Only set if running Python < 3.14 to avoid deprecation warnings
@@ -19,6 +21,49 @@ try:
 except ImportError:
     from agent.graph_batch import build_batch_graph
 
+logger = logging.getLogger(__name__)
+
+
+# The leading underscore keeps the mode out of the cache key: toggling it
+# switches this one pool instead of warming a second set of browsers.
+@st.cache_resource(show_spinner=False)
+def _browser_pool(_headless: bool):
+    """Warm browser pool shared across Streamlit reruns and sessions."""
+    from agent.browser_pool import BrowserPool
+    return BrowserPool(headless=_headless).start()
+
+
+def get_browser_pool(headless: bool):
+    """The shared pool, switched to *headless* if the toggle changed."""
+    pool = _browser_pool(headless)
+    pool.set_headless(headless)
+    return pool
+
+
+@contextmanager
+def lease_browser(headless: bool):
+    """Lease a warm browser endpoint, or yield None if the pool is unavailable."""
+    with ExitStack() as stack:
+        endpoint = None
+        try:
+            from agent.config import Config
+            if Config.BROWSER_POOL_ENABLED:
+                endpoint = stack.enter_context(get_browser_pool(headless).lease())
+        except Exception as pool_err:
+            logger.warning("Browser pool unavailable, using cold launch: %s", pool_err)
+        yield endpoint
+
+
+def warm_browser_pool(headless: bool) -> None:
+    """Start the pool on page load so the first RUN NOW finds warm browsers."""
+    try:
+        from agent.config import Config
+        if Config.BROWSER_POOL_ENABLED:
+            get_browser_pool(headless)
+    except Exception as pool_err:
+        logger.warning("Browser pool warm-up failed: %s", pool_err)
+
+
 # --- PAGE CONFIG ---
 st.set_page_config(
     page_title="AI Agent For Web Testing",
@@ -166,6 +211,7 @@ with header_col1:
 with header_col2:
     st.markdown("<div style='height: 25px;'></div>", unsafe_allow_html=True)
     headless = st.toggle("BACKGROUND MODE", value=True, help="Run browser without visual window")
+    warm_browser_pool(headless)
 
 st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
 
@@ -262,11 +308,14 @@ if st.session_state.active_tab == "start":
                 except Exception as config_err:
                     st.warning(f"Config not applied: {config_err}")
 
-                result = app.invoke({
-                    "instructions": tests,
-                    "settings": settings,
-                    "use_ai_parsing": use_ai_parsing
-                })
+                with lease_browser(headless) as cdp_endpoint:
+                    if cdp_endpoint:
+                        settings["cdp_endpoint"] = cdp_endpoint
+                    result = app.invoke({
+                        "instructions": tests,
+                        "settings": settings,
+                        "use_ai_parsing": use_ai_parsing
+                    })
 
                 status.update(label="🎉 ALL TESTS COMPLETED!", state="complete", expanded=False)
 